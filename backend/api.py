@@ -1,177 +1,139 @@
 import os
-import traceback
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from dotenv import load_dotenv
-from openai import OpenAI
-from langdetect import detect
-from googletrans import Translator
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-
-# ---------- Config ----------
-DATASET_PATH = "data/coaching_millionaer_dataset.json"
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")  # add this to your .env
-PINECONE_INDEX_NAME = "ebook"
+# The shared pipeline (config, retriever, caches, prompts, answer functions)
+import pipeline
+from pipeline import (
+    OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX_NAME, RETRIEVER_BACKEND, EMBEDDING_BACKEND,
+    HYBRID_RETRIEVAL, HYBRID_FUSION,
+    startup, answer_cache, conversations, language_identifier,
+    answer_question, stream_answer, format_answers, format_sse, not_ready_body,
+)
+from metrics import registry, begin_request, end_request
 
 # ---------- App ----------
 app = Flask(__name__)
 CORS(app, resources={r"/ask": {"origins": "*"}})
 
-# ---------- OpenAI Client ----------
-client = None
-if OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-else:
-    print("⚠️  OPENAI_API_KEY is missing in .env")
-
-# ---------- Retriever ----------
-retriever = None
-try:
-    if not PINECONE_API_KEY:
-        raise ValueError("PINECONE_API_KEY missing in .env")
-
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    index = pc.Index(PINECONE_INDEX_NAME)
-    embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-    class PineconeRetriever:
-        def __init__(self, index, embedder):
-            self.index = index
-            self.embedder = embedder
-
-        def retrieve(self, query, top_k=10):
-            emb = self.embedder.encode(query).tolist()
-            res = self.index.query(vector=emb, top_k=top_k, include_metadata=True)
-            matches = res.get("matches", [])
-            results = []
-            for match in matches:
-                meta = match.get("metadata", {})
-                results.append({
-                    "context": meta.get("context", ""),
-                    "page": meta.get("page"),
-                    "score": match.get("score", 0)
-                })
-            return results
-
-    retriever = PineconeRetriever(index, embedder)
-    print("✅ Pinecone retriever initialized successfully.")
-except Exception as e:
-    print("❌ Retriever initialization failed:", e)
-    traceback.print_exc()
-
-translator = Translator()
-
-# ---------- Helpers ----------
-def detect_language(question: str) -> str:
-    """Detect the user's language without translation."""
+def read_question():
+    """Parse the question from the JSON body; raises ValueError on invalid JSON."""
     try:
-        return detect(question)
+        data = request.get_json(force=True) or {}
+        return (data.get("question") or "").strip()
     except Exception:
-        return "unknown"
-
-def normalize_language(lang: str, text: str) -> str:
-    """Fix incorrect language detection like 'wer is' → German."""
-    if lang == "nl" and any(word in text.lower() for word in ["wer", "was", "wie", "javid", "coaching"]):
-        return "de"
-    return lang
-
-def system_prompt_book_only() -> str:
-    return (
-        "You are CoachingBot, a professional mentor trained on the book 'Coaching Millionär' by Javid Niazi-Hoffmann. "
-        "Use only the provided book context to answer the question. "
-        "If the user asks about people like Javid Niazi-Hoffmann, describe them factually using the book content. "
-        "Mention page numbers where possible. "
-        "If the context is not relevant, say you don’t have that information in the book and provide a general, helpful answer. "
-        "Always respond in the same language as the user's question, even if the book content is in another language."
-    )
-
-def system_prompt_fallback() -> str:
-    return (
-        "You are CoachingBot, a helpful business and life mentor. "
-        "The question cannot be answered from the book, so answer using your general coaching knowledge. "
-        "Always respond in the same language as the user's question, even if the book content is in another language. "
-        "Do not invent book citations."
-    )
-
-def format_answers(question: str, answer: str, results):
-    pages = [f"Seite {r.get('page', '')}" for r in results if r.get("page")]
-    source = ", ".join(pages) if pages else "No source"
-    top_score = max([r.get("score", 0.0) for r in results], default=0.0)
-    return {"answers": [{"question": question, "answer": answer, "source": source, "bm25_score": top_score}]}
+        raise ValueError("Invalid JSON request")
+
+def read_session_id():
+    """Session id from the JSON body or X-Session-ID header; a new one when missing or malformed."""
+    data = request.get_json(force=True, silent=True)
+    requested = data.get("session_id") if isinstance(data, dict) else None
+    return conversations.session_id(requested or request.headers.get("X-Session-ID"))
+
+def not_ready_response(question: str = ""):
+    """503 while the heavy components are loading (with a retry hint) or a required one failed."""
+    body, headers = not_ready_body(question)
+    return jsonify(body), 503, headers
+
+# ---------- Startup ----------
+# Models and connections load in the background so the port binds immediately
+startup.start()
+
+# ---------- Metrics ----------
+@app.before_request
+def start_trace():
+    g.trace = begin_request(request.headers.get("X-Request-ID"))
+
+@app.after_request
+def finish_trace(response):
+    trace = g.get("trace")
+    if trace is None or request.endpoint == "prometheus_metrics":
+        return response
+    response.headers["X-Request-ID"] = trace.request_id
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    # Logged on close so streamed responses include their full duration
+    response.call_on_close(lambda: end_request(trace, route, response.status_code))
+    return response
 
 # ---------- Routes ----------
 @app.route("/", methods=["GET"])
 def health():
     return jsonify({
-        "status": "running",
-        "retriever_ready": bool(retriever),
+        "status": "running" if startup.ready else ("starting" if not startup.finished else "degraded"),
+        "startup": startup.status(),
+        "retriever_ready": bool(pipeline.retriever),
         "openai_key_loaded": bool(OPENAI_API_KEY),
         "pinecone_key_loaded": bool(PINECONE_API_KEY),
-        "index_name": PINECONE_INDEX_NAME
+        "index_name": PINECONE_INDEX_NAME,
+        "retriever_backend": RETRIEVER_BACKEND,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "hybrid_retrieval": HYBRID_FUSION if HYBRID_RETRIEVAL else None,
+        "embedding_cache": pipeline.embedder.stats() if pipeline.embedder else None,
+        "embedding_batcher": pipeline.embedding_batcher.stats() if pipeline.embedding_batcher else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "conversations": conversations.stats(),
+        "language": language_identifier.stats()
     })
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus text exposition of latency histograms, counters and cache stats."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/ask", methods=["POST", "OPTIONS"])
 def ask():
     if request.method == "OPTIONS":
         return ("", 204)
+    if not startup.ready:
+        return not_ready_response()
 
     try:
-        data = request.get_json(force=True) or {}
-        question = (data.get("question") or "").strip()
-    except Exception:
-        return jsonify(format_answers("", "Invalid JSON request", [])), 200
+        question = read_question()
+    except ValueError as e:
+        return jsonify(format_answers("", str(e), [])), 200
 
     if not question:
         return jsonify(format_answers("", "Please enter a question.", [])), 200
 
+    session_id = read_session_id()
     print(f"\n--- User Question ---\n{question}")
+    return jsonify({**answer_question(question, session_id), "session_id": session_id})
+
+@app.route("/ask/stream", methods=["POST", "OPTIONS"])
+def ask_stream():
+    """
+    Streaming variant of /ask (Server-Sent Events).
+    Emits a `sources` event after retrieval, one `token` event per completion
+    delta and a final `done` event carrying the regular /ask response body.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+    if not startup.ready:
+        return not_ready_response()
 
-    # Detect and normalize language
-    user_lang = normalize_language(detect_language(question), question)
-    print(f"Detected language: {user_lang}")
-
-    # Retrieve context
-    context, results = "", []
     try:
-        raw_results = retriever.retrieve(question)
-        MIN_SCORE = 0.10  # Pinecone similarity scores are normalized (0–1)
-        results = [r for r in raw_results if r.get("score", 0) >= MIN_SCORE]
-        if results:
-            context = "\n\n---\n\n".join(
-                [f"(Seite {r['page']}) {r['context']}" for r in results]
-            )
-    except Exception as e:
-        traceback.print_exc()
-        return jsonify(format_answers(question, f"Retriever error: {e}", [])), 200
-
-    # Build prompts
-    if context:
-        sys_prompt = system_prompt_book_only()
-        user_content = f"Question: {question}\n\nBook context:\n{context}"
+        question = read_question()
+    except ValueError as e:
+        question, error = "", str(e)
     else:
-        sys_prompt = system_prompt_fallback()
-        user_content = question
-
-    # Query GPT
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_content}
-            ],
-            max_tokens=700,
-        )
-        answer = response.choices[0].message.content.strip()
-    except Exception as e:
-        traceback.print_exc()
-        return jsonify(format_answers(question, f"⚠️ OpenAI call failed: {e}", [])), 200
-
-    return jsonify(format_answers(question, answer, results))
+        error = None if question else "Please enter a question."
+    session_id = read_session_id()
+
+    def generate():
+        if error:
+            yield format_sse("done", format_answers("", error, []))
+            return
+
+        print(f"\n--- User Question (stream) ---\n{question}")
+        for event, data in stream_answer(question, session_id):
+            if event == "done":
+                data = {**data, "session_id": session_id}
+            yield format_sse(event, data)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ---------- Run ----------
 if __name__ == "__main__":
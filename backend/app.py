@@ -1,251 +1,271 @@
 import os
+import time
+import itertools
+import contextvars
 import traceback
-from flask import Flask, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-from dotenv import load_dotenv
-from openai import OpenAI
-from langdetect import detect
-from deep_translator import GoogleTranslator
-import subprocess
-
-# Patch huggingface_hub automatically if Gradio overwrote it
-try:
-    import huggingface_hub
-    if not hasattr(huggingface_hub, "cached_download"):
-        subprocess.run(
-            ["pip", "install", "--no-cache-dir", "huggingface-hub==0.24.5", "transformers==4.30.2", "sentence-transformers==2.2.2"],
-            check=True
-        )
-        print("✅ Downgraded huggingface-hub for sentence-transformers compatibility.")
-except Exception as e:
-    print("⚠️ Could not auto-patch huggingface_hub:", e)
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-
-# ---------- Config ----------
-DATASET_PATH = "data/coaching_millionaer_dataset.json"
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")  # Add this to your .env
-PINECONE_INDEX_NAME = "ebook"
+# The shared pipeline (config, retriever, caches, prompts, answer functions)
+import pipeline
+from pipeline import (
+    OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX_NAME, RETRIEVER_BACKEND, EMBEDDING_BACKEND,
+    HYBRID_RETRIEVAL, HYBRID_FUSION, TTS_WORKERS, AUDIO_CACHE_TTL,
+    startup, answer_cache, conversations, language_identifier, audio_store,
+    answer_question, stream_answer, format_answers, format_sse, not_ready_body,
+    transcribe, synthesize_speech,
+)
+from metrics import registry, annotate, begin_request, current_trace, end_request
+from voice_pipeline import SentenceBuffer, audio_event, speakable
 
 # ---------- App ----------
 app = Flask(__name__)
-CORS(app, resources={r"/ask": {"origins": "*"}})
-
-# ---------- OpenAI Client ----------
-client = None
-if OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-else:
-    print("⚠️  OPENAI_API_KEY is missing in .env")
-
-# ---------- Retriever ----------
-retriever = None
-try:
-    if not PINECONE_API_KEY:
-        raise ValueError("PINECONE_API_KEY missing in .env")
-
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    index = pc.Index(PINECONE_INDEX_NAME)
-    embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-    class PineconeRetriever:
-        def __init__(self, index, embedder):
-            self.index = index
-            self.embedder = embedder
-
-        def retrieve(self, query, top_k=10):
-            emb = self.embedder.encode(query).tolist()
-            res = self.index.query(vector=emb, top_k=top_k, include_metadata=True)
-            matches = res.get("matches", [])
-            results = []
-            for match in matches:
-                meta = match.get("metadata", {})
-                results.append({
-                    "context": meta.get("context", ""),
-                    "page": meta.get("page"),
-                    "score": match.get("score", 0)
-                })
-            return results
-
-    retriever = PineconeRetriever(index, embedder)
-    print("✅ Pinecone retriever initialized successfully.")
-except Exception as e:
-    print("❌ Retriever initialization failed:", e)
-    traceback.print_exc()
-
-# ---------- Translator ----------
-def translate_text(text: str, target_lang: str) -> str:
-    """Translate text using deep-translator (GoogleTranslator)."""
-    try:
-        return GoogleTranslator(source="auto", target=target_lang).translate(text)
-    except Exception:
-        return text
+CORS(app, resources={r"/(ask|voice|audio)": {"origins": "*"}})
 
-# ---------- Helpers ----------
-def detect_language(question: str) -> str:
-    """Detect the user's language without translation."""
+def read_question():
+    """Parse the question from the JSON body; raises ValueError on invalid JSON."""
     try:
-        return detect(question)
+        data = request.get_json(force=True) or {}
+        return (data.get("question") or "").strip()
     except Exception:
-        return "unknown"
-
-def normalize_language(lang: str, text: str) -> str:
-    """Fix incorrect language detection like 'wer is' → German."""
-    if lang == "nl" and any(word in text.lower() for word in ["wer", "was", "wie", "javid", "coaching"]):
-        return "de"
-    return lang
-
-def system_prompt_book_only() -> str:
-    return (
-        "You are CoachingBot, a professional mentor trained on the book 'Coaching Millionär' by Javid Niazi-Hoffmann. "
-        "Use only the provided book context to answer the question. "
-        "If the user asks about people like Javid Niazi-Hoffmann, describe them factually using the book content. "
-        "Mention page numbers where possible. "
-        "If the context is not relevant, say you don’t have that information in the book and provide a general, helpful answer. "
-        "Always respond in the same language as the user's question, even if the book content is in another language."
-    )
-
-def system_prompt_fallback() -> str:
-    return (
-        "You are CoachingBot, a helpful business and life mentor. "
-        "The question cannot be answered from the book, so answer using your general coaching knowledge. "
-        "Always respond in the same language as the user's question, even if the book content is in another language. "
-        "Do not invent book citations."
-    )
-
-def format_answers(question: str, answer: str, results):
-    pages = [f"Seite {r.get('page', '')}" for r in results if r.get("page")]
-    source = ", ".join(pages) if pages else "No source"
-    top_score = max([r.get("score", 0.0) for r in results], default=0.0)
-    return {"answers": [{"question": question, "answer": answer, "source": source, "bm25_score": top_score}]}
+        raise ValueError("Invalid JSON request")
+
+def read_session_id():
+    """Session id from the JSON body or X-Session-ID header; a new one when missing or malformed."""
+    data = request.get_json(force=True, silent=True)
+    requested = data.get("session_id") if isinstance(data, dict) else None
+    return conversations.session_id(requested or request.headers.get("X-Session-ID"))
+
+def not_ready_response(question: str = ""):
+    """503 while the heavy components are loading (with a retry hint) or a required one failed."""
+    body, headers = not_ready_body(question)
+    return jsonify(body), 503, headers
+
+# ---------- Startup ----------
+# Models and connections load in the background so the port binds immediately
+startup.start()
+
+# ---------- Metrics ----------
+@app.before_request
+def start_trace():
+    g.trace = begin_request(request.headers.get("X-Request-ID"))
+
+@app.after_request
+def finish_trace(response):
+    trace = g.get("trace")
+    if trace is None or request.endpoint == "prometheus_metrics":
+        return response
+    response.headers["X-Request-ID"] = trace.request_id
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    # Logged on close so streamed responses include their full duration
+    response.call_on_close(lambda: end_request(trace, route, response.status_code))
+    return response
 
 # ---------- Routes ----------
 @app.route("/", methods=["GET"])
 def health():
     return jsonify({
-        "status": "running",
-        "retriever_ready": bool(retriever),
+        "status": "running" if startup.ready else ("starting" if not startup.finished else "degraded"),
+        "startup": startup.status(),
+        "retriever_ready": bool(pipeline.retriever),
         "openai_key_loaded": bool(OPENAI_API_KEY),
         "pinecone_key_loaded": bool(PINECONE_API_KEY),
-        "index_name": PINECONE_INDEX_NAME
+        "index_name": PINECONE_INDEX_NAME,
+        "retriever_backend": RETRIEVER_BACKEND,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "hybrid_retrieval": HYBRID_FUSION if HYBRID_RETRIEVAL else None,
+        "embedding_cache": pipeline.embedder.stats() if pipeline.embedder else None,
+        "embedding_batcher": pipeline.embedding_batcher.stats() if pipeline.embedding_batcher else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "conversations": conversations.stats(),
+        "language": language_identifier.stats(),
+        "audio_store": audio_store.stats()
     })
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus text exposition of latency histograms, counters and cache stats."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 @app.route("/ask", methods=["POST", "OPTIONS"])
 def ask():
     if request.method == "OPTIONS":
         return ("", 204)
+    if not startup.ready:
+        return not_ready_response()
 
     try:
-        data = request.get_json(force=True) or {}
-        question = (data.get("question") or "").strip()
-    except Exception:
-        return jsonify(format_answers("", "Invalid JSON request", [])), 200
+        question = read_question()
+    except ValueError as e:
+        return jsonify(format_answers("", str(e), [])), 200
 
     if not question:
         return jsonify(format_answers("", "Please enter a question.", [])), 200
 
+    session_id = read_session_id()
     print(f"\n--- User Question ---\n{question}")
+    return jsonify({**answer_question(question, session_id), "session_id": session_id})
+
+@app.route("/ask/stream", methods=["POST", "OPTIONS"])
+def ask_stream():
+    """
+    Streaming variant of /ask (Server-Sent Events).
+    Emits a `sources` event after retrieval, one `token` event per completion
+    delta and a final `done` event carrying the regular /ask response body.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+    if not startup.ready:
+        return not_ready_response()
 
-    # Detect and normalize language
-    user_lang = normalize_language(detect_language(question), question)
-    print(f"Detected language: {user_lang}")
-
-    # Retrieve context
-    context, results = "", []
     try:
-        raw_results = retriever.retrieve(question)
-        MIN_SCORE = 0.10  # Pinecone similarity scores are normalized (0–1)
-        results = [r for r in raw_results if r.get("score", 0) >= MIN_SCORE]
-        if results:
-            context = "\n\n---\n\n".join(
-                [f"(Seite {r['page']}) {r['context']}" for r in results]
-            )
-    except Exception as e:
-        traceback.print_exc()
-        return jsonify(format_answers(question, f"Retriever error: {e}", [])), 200
-
-    # Build prompts
-    if context:
-        sys_prompt = system_prompt_book_only()
-        user_content = f"Question: {question}\n\nBook context:\n{context}"
+        question = read_question()
+    except ValueError as e:
+        question, error = "", str(e)
     else:
-        sys_prompt = system_prompt_fallback()
-        user_content = question
-
-    # Query GPT
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_content}
-            ],
-            max_tokens=700,
-        )
-        answer = response.choices[0].message.content.strip()
-    except Exception as e:
-        traceback.print_exc()
-        return jsonify(format_answers(question, f"⚠️ OpenAI call failed: {e}", [])), 200
+        error = None if question else "Please enter a question."
+    session_id = read_session_id()
+
+    def generate():
+        if error:
+            yield format_sse("done", format_answers("", error, []))
+            return
+
+        print(f"\n--- User Question (stream) ---\n{question}")
+        for event, data in stream_answer(question, session_id):
+            if event == "done":
+                data = {**data, "session_id": session_id}
+            yield format_sse(event, data)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return jsonify(format_answers(question, answer, results))
+# ---------- Voice ----------
+tts_pool = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
 
-from flask import send_file
-import tempfile
+def read_audio_upload():
+    """(bytes, filename) of the `audio` form field, or None when missing."""
+    audio = request.files.get("audio")
+    if not audio:
+        return None
+    return audio.read(), audio.filename
 
 @app.route("/voice", methods=["POST"])
 def voice_chat():
+    if not startup.ready:
+        return not_ready_response()
     try:
-        audio = request.files.get("audio")
-        if not audio:
+        upload = read_audio_upload()
+        if not upload:
             return jsonify({"error": "No audio file uploaded"}), 400
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            audio.save(tmp.name)
-            audio_path = tmp.name
-
-        # Step 1️⃣: Transcribe using OpenAI Whisper or any STT
-        transcription = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=open(audio_path, "rb")
-        )
-        text = transcription.text.strip()
+        # Step 1️⃣: Transcribe using OpenAI Whisper
+        text = transcribe(*upload)
         print(f"🎤 Transcribed: {text}")
 
-        # Step 2️⃣: Get mentoring answer from your existing /ask logic
-        data = {"question": text}
-        with app.test_request_context(json=data):
-            response = ask()
-        response_json = response.get_json()
-
-        # Step 3️⃣: Optional TTS response
-        answer_text = response_json["answers"][0]["answer"]
-        speech_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        with client.audio.speech.with_streaming_response.create(
-            model="gpt-4o-mini-tts",
-            voice="alloy",
-            input=answer_text
-        ) as speech:
-            speech.stream_to_file(speech_file.name)
+        # Step 2️⃣: Get mentoring answer from the /ask pipeline
+        session_id = conversations.session_id(request.form.get("session_id"))
+        answer_text = answer_question(text, session_id)["answers"][0]["answer"]
+
+        # Step 3️⃣: TTS response (cached by content in the audio store)
+        key, _ = synthesize_speech(speakable(answer_text))
 
         return jsonify({
             "transcript": text,
             "answer": answer_text,
-            "audio_url": f"/audio/{os.path.basename(speech_file.name)}"
+            "audio_url": f"/audio/{key}.mp3",
+            "session_id": session_id
         })
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route("/voice/stream", methods=["POST"])
+def voice_stream():
+    """
+    Pipelined voice chat (Server-Sent Events), without temp files.
+    Emits `transcript`, then `sources` and `token` events while the answer
+    streams. Each complete sentence goes to TTS right away (up to TTS_WORKERS
+    in parallel), and an `audio` event carries its base64 mp3 in sentence
+    order. A final `done` event holds the transcript and full answer.
+    """
+    if not startup.ready:
+        return not_ready_response()
+    upload = read_audio_upload()
+    if not upload:
+        return jsonify({"error": "No audio file uploaded"}), 400
+    session_id = conversations.session_id(request.form.get("session_id"))
+    trace = current_trace()
+
+    def generate():
+        try:
+            text = transcribe(*upload)
+        except Exception as e:
+            traceback.print_exc()
+            yield format_sse("done", {"error": f"Transcription failed: {e}"})
+            return
+        print(f"🎤 Transcribed: {text}")
+        yield format_sse("transcript", {"text": text})
+
+        sentences = SentenceBuffer()
+        indexes = itertools.count()
+        pending = []  # (index, sentence, future) in answer order
+
+        def submit(sentence):
+            future = tts_pool.submit(contextvars.copy_context().run, synthesize_speech, speakable(sentence))
+            pending.append((next(indexes), sentence, future))
+
+        def ready_audio(block=False):
+            # Audio is emitted strictly in sentence order
+            while pending and (block or pending[0][2].done()):
+                index, sentence, future = pending.pop(0)
+                try:
+                    key, audio = future.result()
+                except Exception as e:
+                    traceback.print_exc()
+                    yield format_sse("audio_error", {"index": index, "error": str(e)})
+                    continue
+                if index == 0:
+                    annotate(first_audio_ms=round((time.perf_counter() - trace.started) * 1000, 2))
+                yield format_sse("audio", audio_event(index, sentence, audio, url=f"/audio/{key}.mp3"))
+
+        body = None
+        for event, data in stream_answer(text, session_id):
+            if event == "token":
+                for sentence in sentences.feed(data["text"]):
+                    submit(sentence)
+            if event == "done":
+                body = data
+                continue
+            yield format_sse(event, data)
+            yield from ready_audio()
+
+        for sentence in sentences.flush():
+            submit(sentence)
+        yield from ready_audio(block=True)
+
+        answer = body["answers"][0]["answer"] if body else ""
+        yield format_sse("done", {"transcript": text, "answer": answer, **(body or {}), "session_id": session_id})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.route("/audio/<filename>")
 def serve_audio(filename):
-    return send_file(os.path.join(tempfile.gettempdir(), filename), mimetype="audio/mpeg")
+    """Stored speech with Range and ETag support; keys are content hashes, so clips never change."""
+    key = filename[:-len(".mp3")] if filename.endswith(".mp3") else filename
+    path = audio_store.path(key)
+    if path is None:
+        return jsonify({"error": "Audio not found"}), 404
+    return send_file(path, mimetype="audio/mpeg", conditional=True, etag=key, max_age=AUDIO_CACHE_TTL)
 
 # ---------- Run ----------
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 7860))
     print(f"🚀 Server started on port {port}")
-    app.run(host="0.0.0.0", port=port)
+    app.run(host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,457 @@
+"""
+Async (ASGI) serving mode for the CoachingBot backend.
+
+Exposes the same routes as app.py on the shared pipeline module, but awaits
+OpenAI and Pinecone with async clients and runs CPU work (embedding, BM25,
+langdetect, token counting, cache lookups) on a bounded thread pool, so one
+worker multiplexes many in-flight requests on its event loop.
+
+Run with a production ASGI server, e.g.:
+    uvicorn asgi:app --host 0.0.0.0 --port 7860
+"""
+import os
+import asyncio
+import contextvars
+import itertools
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, Response, g, request, jsonify, send_file
+from quart_cors import cors
+
+# Shared state and helpers (retriever, caches, prompts) live in the pipeline module
+import pipeline as core
+from clients import create_async_openai_client, create_async_pinecone_index
+from retriever.hybrid_retriever import HybridRetriever
+from metrics import registry, span, annotate, begin_request, current_trace, end_request, record_usage, resume
+from voice_pipeline import SentenceBuffer, audio_event, speakable
+
+# ---------- Config ----------
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", os.cpu_count() or 4))  # embedding / langdetect pool size
+
+# ---------- App ----------
+app = Quart(__name__)
+app = cors(app, allow_origin="*")
+
+# ---------- OpenAI Client ----------
+aclient = create_async_openai_client(core.OPENAI_API_KEY)
+
+# ---------- Executor ----------
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+async def run_cpu(fn, *args):
+    """Run blocking CPU or client work on the bounded pool (keeping the request trace)."""
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(cpu_pool, ctx.run, fn, *args)
+
+# ---------- Startup ----------
+async_index = None
+
+def init_async_index():
+    """Async Pinecone query handle; the local index is searched on the CPU pool instead."""
+    global async_index
+    if core.RETRIEVER_BACKEND != "local":
+        async_index = create_async_pinecone_index(core.PINECONE_API_KEY, core.PINECONE_INDEX_NAME)
+
+core.startup.register("async_index", init_async_index)
+core.startup.start()
+
+# ---------- Retrieval ----------
+async def query_pinecone(vector, top_k):
+    res = await async_index.query(vector=vector.tolist(), top_k=top_k, include_metadata=True)
+    return core.PineconeRetriever.to_results(res)
+
+async def retrieve_context(question: str):
+    """Async core.retrieve_context(): the Pinecone query is awaited, CPU stages run on the pool."""
+    retriever = core.retriever
+    with span("encode"):
+        vector = await run_cpu(retriever.embedder.encode, question)
+    with span("vector_query"):
+        if async_index is None:
+            raw_results = await run_cpu(retriever.retrieve, question, core.RETRIEVE_TOP_K)
+        elif isinstance(retriever, HybridRetriever):
+            # BM25 scores on the pool while the dense query is in flight
+            dense, lexical = await asyncio.gather(
+                query_pinecone(vector, retriever.candidates),
+                run_cpu(retriever.lexical, question, retriever.candidates),
+            )
+            raw_results = retriever.fuse(dense, lexical, core.RETRIEVE_TOP_K)
+        else:
+            raw_results = await query_pinecone(vector, core.RETRIEVE_TOP_K)
+    return await run_cpu(core.pack_context, raw_results)
+
+# ---------- Pipeline ----------
+async def prepare(question: str, history):
+    """Detect language, check the answer cache (first turns only) and retrieve context."""
+    with span("language_detection"):
+        # Cache hits and the de/en fast path are cheaper than a hop to the pool
+        known = core.language_identifier.lookup(question)
+        user_lang = known[0] if known else await run_cpu(core.detect_language, question)
+    print(f"Detected language: {user_lang}")
+    annotate(language=user_lang, answer_cache="miss", history_messages=len(history))
+
+    question_emb = None
+    if core.answer_cache and core.retriever and not history:
+        with span("encode"):
+            question_emb = await run_cpu(core.retriever.embedder.encode, question)
+        # May re-fingerprint the dataset and index files
+        cached = await run_cpu(core.answer_cache.lookup, question_emb, user_lang)
+        if cached:
+            print(f"⚡ Answer cache hit (similarity {cached['similarity']:.3f})")
+            annotate(answer_cache="hit")
+            return user_lang, question_emb, cached["results"], cached["answer"]
+
+    results = await retrieve_context(question)
+    return user_lang, question_emb, results, None
+
+async def answer_question(question: str, session_id=None):
+    """Async equivalent of core.answer_question(); returns the format_answers body."""
+    history = core.conversations.history(session_id)
+    try:
+        user_lang, question_emb, results, cached_answer = await prepare(question, history)
+    except Exception as e:
+        traceback.print_exc()
+        return core.format_answers(question, f"Retriever error: {e}", [])
+
+    if cached_answer is not None:
+        await run_cpu(core.conversations.record, session_id, question, cached_answer)
+        return core.format_answers(question, cached_answer, results)
+
+    try:
+        messages = await run_cpu(core.build_messages, question, results, history)
+        with span("completion"):
+            response = await aclient.chat.completions.create(
+                model=core.CHAT_MODEL,
+                messages=messages,
+                max_tokens=700,
+            )
+        record_usage(response.usage)
+        answer = response.choices[0].message.content.strip()
+    except Exception as e:
+        traceback.print_exc()
+        return core.format_answers(question, f"⚠️ OpenAI call failed: {e}", [])
+
+    if question_emb is not None:
+        core.answer_cache.store(question_emb, user_lang, results, answer)
+    await run_cpu(core.conversations.record, session_id, question, answer)
+    return core.format_answers(question, answer, results)
+
+async def stream_answer(question: str, session_id=None):
+    """Async equivalent of core.stream_answer(); yields (event, data)."""
+    history = core.conversations.history(session_id)
+    try:
+        user_lang, question_emb, results, cached_answer = await prepare(question, history)
+    except Exception as e:
+        traceback.print_exc()
+        yield "done", core.format_answers(question, f"Retriever error: {e}", [])
+        return
+
+    yield "sources", {
+        "language": user_lang,
+        "sources": [{"page": r.get("page"), "score": r.get("score", 0.0)} for r in results],
+        "cached": cached_answer is not None
+    }
+    if cached_answer is not None:
+        await run_cpu(core.conversations.record, session_id, question, cached_answer)
+        yield "token", {"text": cached_answer}
+        yield "done", core.format_answers(question, cached_answer, results)
+        return
+
+    parts = []
+    try:
+        messages = await run_cpu(core.build_messages, question, results, history)
+        with span("completion"):
+            stream = await aclient.chat.completions.create(
+                model=core.CHAT_MODEL,
+                messages=messages,
+                max_tokens=700,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            started = time.perf_counter()
+            async for chunk in stream:
+                if chunk.usage:
+                    record_usage(chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not parts:
+                        annotate(first_token_ms=round((time.perf_counter() - started) * 1000, 2))
+                    parts.append(delta)
+                    yield "token", {"text": delta}
+    except Exception as e:
+        traceback.print_exc()
+        yield "done", core.format_answers(question, f"⚠️ OpenAI call failed: {e}", [])
+        return
+
+    answer = "".join(parts).strip()
+    if question_emb is not None:
+        core.answer_cache.store(question_emb, user_lang, results, answer)
+    await run_cpu(core.conversations.record, session_id, question, answer)
+    yield "done", core.format_answers(question, answer, results)
+
+def sse_response(events, route):
+    """Stream SSE `events`, keeping the request trace and logging it once the body ends."""
+    trace = current_trace()
+
+    async def generate():
+        resume(trace)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            end_request(trace, route, 200)
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.timeout = None
+    return response
+
+def not_ready_response():
+    """503 while core.startup is loading (with a retry hint) or a required component failed."""
+    body, headers = core.not_ready_body()
+    return jsonify(body), 503, headers
+
+async def read_question():
+    try:
+        data = await request.get_json(force=True) or {}
+        return (data.get("question") or "").strip()
+    except Exception:
+        raise ValueError("Invalid JSON request")
+
+async def read_session_id():
+    data = await request.get_json(force=True, silent=True)
+    requested = data.get("session_id") if isinstance(data, dict) else None
+    return core.conversations.session_id(requested or request.headers.get("X-Session-ID"))
+
+# ---------- Metrics ----------
+@app.before_request
+async def start_trace():
+    g.trace = begin_request(request.headers.get("X-Request-ID"))
+
+@app.after_request
+async def finish_trace(response):
+    trace = g.get("trace")
+    if trace is None or request.endpoint == "prometheus_metrics":
+        return response
+    response.headers["X-Request-ID"] = trace.request_id
+    # Streamed bodies log their own trace once the last event is sent
+    if response.mimetype != "text/event-stream":
+        end_request(trace, request.url_rule.rule if request.url_rule else "unmatched", response.status_code)
+    return response
+
+# ---------- Routes ----------
+@app.route("/", methods=["GET"])
+async def health():
+    return jsonify({
+        "status": "running" if core.startup.ready else ("starting" if not core.startup.finished else "degraded"),
+        "startup": core.startup.status(),
+        "mode": "asgi",
+        "cpu_workers": CPU_WORKERS,
+        "retriever_ready": bool(core.retriever),
+        "openai_key_loaded": bool(core.OPENAI_API_KEY),
+        "pinecone_key_loaded": bool(core.PINECONE_API_KEY),
+        "index_name": core.PINECONE_INDEX_NAME,
+        "retriever_backend": core.RETRIEVER_BACKEND,
+        "embedding_backend": core.EMBEDDING_BACKEND,
+        "hybrid_retrieval": core.HYBRID_FUSION if core.HYBRID_RETRIEVAL else None,
+        "embedding_cache": core.embedder.stats() if core.embedder else None,
+        "embedding_batcher": core.embedding_batcher.stats() if core.embedding_batcher else None,
+        "answer_cache": core.answer_cache.stats() if core.answer_cache else None,
+        "conversations": core.conversations.stats(),
+        "language": core.language_identifier.stats(),
+        "audio_store": core.audio_store.stats()
+    })
+
+@app.route("/metrics", methods=["GET"])
+async def prometheus_metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/ask", methods=["POST", "OPTIONS"])
+async def ask():
+    if request.method == "OPTIONS":
+        return ("", 204)
+    if not core.startup.ready:
+        return not_ready_response()
+
+    try:
+        question = await read_question()
+    except ValueError as e:
+        return jsonify(core.format_answers("", str(e), [])), 200
+
+    if not question:
+        return jsonify(core.format_answers("", "Please enter a question.", [])), 200
+
+    session_id = await read_session_id()
+    print(f"\n--- User Question ---\n{question}")
+    return jsonify({**await answer_question(question, session_id), "session_id": session_id})
+
+@app.route("/ask/stream", methods=["POST", "OPTIONS"])
+async def ask_stream():
+    if request.method == "OPTIONS":
+        return ("", 204)
+    if not core.startup.ready:
+        return not_ready_response()
+
+    try:
+        question = await read_question()
+    except ValueError as e:
+        question, error = "", str(e)
+    else:
+        error = None if question else "Please enter a question."
+    session_id = await read_session_id()
+
+    async def stream_events():
+        if error:
+            yield core.format_sse("done", core.format_answers("", error, []))
+            return
+
+        print(f"\n--- User Question (stream) ---\n{question}")
+        async for event, data in stream_answer(question, session_id):
+            if event == "done":
+                data = {**data, "session_id": session_id}
+            yield core.format_sse(event, data)
+
+    return sse_response(stream_events(), "/ask/stream")
+
+# ---------- Voice ----------
+tts_slots = asyncio.Semaphore(core.TTS_WORKERS)
+
+async def transcribe(audio_bytes: bytes, filename: str) -> str:
+    with span("transcription"):
+        transcription = await aclient.audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename or "audio.webm", audio_bytes)
+        )
+    return transcription.text.strip()
+
+async def synthesize_speech(text: str):
+    """Async core.synthesize_speech(): (store key, mp3 bytes); at most TTS_WORKERS calls run at once."""
+    key = core.AudioStore.key(core.TTS_MODEL, core.TTS_VOICE, text)
+    audio = await run_cpu(core.audio_store.get, key)
+    if audio is None:
+        async with tts_slots:
+            with span("speech"):
+                async with aclient.audio.speech.with_streaming_response.create(
+                    model=core.TTS_MODEL,
+                    voice=core.TTS_VOICE,
+                    input=text,
+                    response_format="mp3"
+                ) as speech:
+                    audio = b"".join([chunk async for chunk in speech.iter_bytes()])
+        await run_cpu(core.audio_store.put, key, audio)
+    return key, audio
+
+async def read_audio_upload():
+    files = await request.files
+    audio = files.get("audio")
+    if not audio:
+        return None
+    return audio.read(), audio.filename
+
+async def read_form_session_id():
+    form = await request.form
+    return core.conversations.session_id(form.get("session_id"))
+
+@app.route("/voice", methods=["POST"])
+async def voice_chat():
+    if not core.startup.ready:
+        return not_ready_response()
+    try:
+        upload = await read_audio_upload()
+        if not upload:
+            return jsonify({"error": "No audio file uploaded"}), 400
+
+        # Step 1️⃣: Transcribe using OpenAI Whisper
+        text = await transcribe(*upload)
+        print(f"🎤 Transcribed: {text}")
+
+        # Step 2️⃣: Get mentoring answer from the /ask pipeline
+        session_id = await read_form_session_id()
+        response_json = await answer_question(text, session_id)
+
+        # Step 3️⃣: TTS response (cached by content in the audio store)
+        answer_text = response_json["answers"][0]["answer"]
+        key, _ = await synthesize_speech(speakable(answer_text))
+
+        return jsonify({
+            "transcript": text,
+            "answer": answer_text,
+            "audio_url": f"/audio/{key}.mp3",
+            "session_id": session_id
+        })
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/voice/stream", methods=["POST"])
+async def voice_stream():
+    """Pipelined voice chat; same events as app.voice_stream()."""
+    if not core.startup.ready:
+        return not_ready_response()
+    upload = await read_audio_upload()
+    if not upload:
+        return jsonify({"error": "No audio file uploaded"}), 400
+    session_id = await read_form_session_id()
+    trace = current_trace()
+
+    async def stream_events():
+        try:
+            text = await transcribe(*upload)
+        except Exception as e:
+            traceback.print_exc()
+            yield core.format_sse("done", {"error": f"Transcription failed: {e}"})
+            return
+        print(f"🎤 Transcribed: {text}")
+        yield core.format_sse("transcript", {"text": text})
+
+        sentences = SentenceBuffer()
+        indexes = itertools.count()
+        pending = []  # (index, sentence, task) in answer order
+
+        def submit(sentence):
+            pending.append((next(indexes), sentence, asyncio.ensure_future(synthesize_speech(speakable(sentence)))))
+
+        async def ready_audio(block=False):
+            # Audio is emitted strictly in sentence order
+            while pending and (block or pending[0][2].done()):
+                index, sentence, task = pending.pop(0)
+                try:
+                    key, audio = await task
+                except Exception as e:
+                    traceback.print_exc()
+                    yield core.format_sse("audio_error", {"index": index, "error": str(e)})
+                    continue
+                if index == 0:
+                    annotate(first_audio_ms=round((time.perf_counter() - trace.started) * 1000, 2))
+                yield core.format_sse("audio", audio_event(index, sentence, audio, url=f"/audio/{key}.mp3"))
+
+        body = None
+        async for event, data in stream_answer(text, session_id):
+            if event == "token":
+                for sentence in sentences.feed(data["text"]):
+                    submit(sentence)
+            if event == "done":
+                body = data
+                continue
+            yield core.format_sse(event, data)
+            async for audio in ready_audio():
+                yield audio
+
+        for sentence in sentences.flush():
+            submit(sentence)
+        async for audio in ready_audio(block=True):
+            yield audio
+
+        answer = body["answers"][0]["answer"] if body else ""
+        yield core.format_sse("done", {"transcript": text, "answer": answer, **(body or {}), "session_id": session_id})
+
+    return sse_response(stream_events(), "/voice/stream")
+
+@app.route("/audio/<filename>")
+async def serve_audio(filename):
+    key = filename[:-len(".mp3")] if filename.endswith(".mp3") else filename
+    path = core.audio_store.path(key)
+    if path is None:
+        return jsonify({"error": "Audio not found"}), 404
+    return await send_file(path, mimetype="audio/mpeg", conditional=True, etag=key, max_age=core.AUDIO_CACHE_TTL)
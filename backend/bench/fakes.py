@@ -0,0 +1,252 @@
+"""
+Local stand-ins for the OpenAI and Pinecone clients.
+
+They mimic the small part of each SDK the apps use (chat completions with and
+without streaming, transcriptions, streamed speech, sync and async
+index.query) and sleep for a configurable latency instead of calling the
+network. clients.py returns them when USE_FAKE_CLIENTS=1.
+
+Latency knobs (milliseconds unless noted):
+    FAKE_CHAT_TTFT_MS   time to first completion token   (250)
+    FAKE_TOKEN_MS       time per further token            (15)
+    FAKE_ANSWER_TOKENS  tokens per answer                 (150)
+    FAKE_STT_MS         transcription                     (400)
+    FAKE_TTS_MS         speech synthesis                  (300)
+    FAKE_PINECONE_MS    vector query round trip           (40)
+    FAKE_JITTER         ± fraction applied to every delay (0.2)
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+import numpy as np
+
+DATASET_PATH = "data/coaching_millionaer_dataset.json"
+LOCAL_INDEX_DIR = "data/local_index"
+
+# Frame header of an MPEG-2 layer III frame; the payload is silence-sized filler, not playable audio
+MP3_FRAME = b"\xff\xf3\x44\xc4" + bytes(140)
+
+
+class FakeLatency:
+    def __init__(self):
+        self.chat_ttft = float(os.getenv("FAKE_CHAT_TTFT_MS", 250)) / 1000
+        self.token = float(os.getenv("FAKE_TOKEN_MS", 15)) / 1000
+        self.answer_tokens = int(os.getenv("FAKE_ANSWER_TOKENS", 150))
+        self.stt = float(os.getenv("FAKE_STT_MS", 400)) / 1000
+        self.tts = float(os.getenv("FAKE_TTS_MS", 300)) / 1000
+        self.pinecone = float(os.getenv("FAKE_PINECONE_MS", 40)) / 1000
+        self.jitter = float(os.getenv("FAKE_JITTER", 0.2))
+
+    def __call__(self, seconds):
+        """Delay with uniform ±jitter applied."""
+        return max(0.0, seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+latency = FakeLatency()
+
+
+def _prompt_text(messages):
+    return " ".join(m.get("content", "") for m in messages)
+
+
+def _answer_tokens(messages, n):
+    """Deterministic pseudo-answer built from the question's words."""
+    words = _prompt_text(messages[-1:]).split()[:40] or ["Coaching"]
+    return [("" if i == 0 else " ") + words[i % len(words)] for i in range(n)]
+
+
+def _usage(messages, completion_tokens):
+    return SimpleNamespace(
+        prompt_tokens=max(1, len(_prompt_text(messages)) // 4),
+        completion_tokens=completion_tokens,
+        total_tokens=max(1, len(_prompt_text(messages)) // 4) + completion_tokens,
+    )
+
+
+def _completion(messages, tokens):
+    message = SimpleNamespace(role="assistant", content="".join(tokens))
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                           usage=_usage(messages, len(tokens)))
+
+
+def _chunk(text=None, usage=None):
+    choices = [] if text is None else [SimpleNamespace(index=0, delta=SimpleNamespace(content=text))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def _speech_bytes(text):
+    # Roughly 15 characters of speech per second at 24 kbit/s
+    frames = max(1, int(len(text) / 15 * 24000 / 8 / len(MP3_FRAME)))
+    return MP3_FRAME * frames
+
+
+# ---------- Sync client ----------
+class _ChatCompletions:
+    def create(self, model, messages, max_tokens=None, stream=False, stream_options=None, **kwargs):
+        tokens = _answer_tokens(messages, min(latency.answer_tokens, max_tokens or latency.answer_tokens))
+        if not stream:
+            time.sleep(latency(latency.chat_ttft + latency.token * (len(tokens) - 1)))
+            return _completion(messages, tokens)
+        return self._stream(messages, tokens, bool((stream_options or {}).get("include_usage")))
+
+    @staticmethod
+    def _stream(messages, tokens, include_usage):
+        time.sleep(latency(latency.chat_ttft))
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(latency(latency.token))
+            yield _chunk(token)
+        if include_usage:
+            yield _chunk(usage=_usage(messages, len(tokens)))
+
+
+class _Transcriptions:
+    def create(self, model, file, **kwargs):
+        data = file[1] if isinstance(file, tuple) else file.read()
+        time.sleep(latency(latency.stt))
+        return SimpleNamespace(text=f"Wie gewinne ich Traumkunden? ({len(data)} bytes audio)")
+
+
+class _SpeechResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def __enter__(self):
+        time.sleep(latency(latency.tts))
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_bytes(self, chunk_size=4096):
+        data = _speech_bytes(self.text)
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    def read(self):
+        return _speech_bytes(self.text)
+
+    def stream_to_file(self, path):
+        with open(path, "wb") as f:
+            for chunk in self.iter_bytes():
+                f.write(chunk)
+
+
+class _Speech:
+    def __init__(self):
+        self.with_streaming_response = self
+
+    def create(self, model, voice, input, **kwargs):
+        return _SpeechResponse(input)
+
+
+class FakeOpenAI:
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=_ChatCompletions())
+        self.audio = SimpleNamespace(transcriptions=_Transcriptions(), speech=_Speech())
+
+
+# ---------- Async client ----------
+class _AsyncChatCompletions:
+    async def create(self, model, messages, max_tokens=None, stream=False, stream_options=None, **kwargs):
+        tokens = _answer_tokens(messages, min(latency.answer_tokens, max_tokens or latency.answer_tokens))
+        if not stream:
+            await asyncio.sleep(latency(latency.chat_ttft + latency.token * (len(tokens) - 1)))
+            return _completion(messages, tokens)
+        return self._stream(messages, tokens, bool((stream_options or {}).get("include_usage")))
+
+    @staticmethod
+    async def _stream(messages, tokens, include_usage):
+        await asyncio.sleep(latency(latency.chat_ttft))
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(latency(latency.token))
+            yield _chunk(token)
+        if include_usage:
+            yield _chunk(usage=_usage(messages, len(tokens)))
+
+
+class _AsyncTranscriptions:
+    async def create(self, model, file, **kwargs):
+        data = file[1] if isinstance(file, tuple) else file.read()
+        await asyncio.sleep(latency(latency.stt))
+        return SimpleNamespace(text=f"Wie gewinne ich Traumkunden? ({len(data)} bytes audio)")
+
+
+class _AsyncSpeechResponse(_SpeechResponse):
+    async def __aenter__(self):
+        await asyncio.sleep(latency(latency.tts))
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def iter_bytes(self, chunk_size=4096):
+        for chunk in super().iter_bytes(chunk_size):
+            yield chunk
+
+    async def read(self):
+        return _speech_bytes(self.text)
+
+    async def stream_to_file(self, path):
+        with open(path, "wb") as f:
+            f.write(_speech_bytes(self.text))
+
+
+class _AsyncSpeech(_Speech):
+    def create(self, model, voice, input, **kwargs):
+        return _AsyncSpeechResponse(input)
+
+
+class FakeAsyncOpenAI:
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=_AsyncChatCompletions())
+        self.audio = SimpleNamespace(transcriptions=_AsyncTranscriptions(), speech=_AsyncSpeech())
+
+
+# ---------- Pinecone ----------
+class FakePineconeIndex:
+    """
+    In-memory index over the book passages with seeded random vectors.
+    Scores are cosine mapped to 0–1, so results are arbitrary but the
+    query cost (one matrix-vector product + top-k) and payload are realistic.
+    """
+
+    def __init__(self, dim=384, seed=0):
+        meta_path = os.path.join(LOCAL_INDEX_DIR, "metadata.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.documents = json.load(f)
+        else:
+            from retriever.local_retriever import load_documents
+            self.documents = load_documents(DATASET_PATH)
+        vectors = np.random.default_rng(seed).standard_normal((len(self.documents), dim)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def query(self, vector, top_k=10, include_metadata=True, **kwargs):
+        time.sleep(latency(latency.pinecone))
+        return self._search(vector, top_k, include_metadata)
+
+    def _search(self, vector, top_k, include_metadata):
+        q = np.asarray(vector, dtype=np.float32)
+        scores = (self.vectors @ (q / (np.linalg.norm(q) or 1.0)) + 1.0) / 2.0
+        top = np.argsort(-scores)[:top_k]
+        matches = []
+        for i in top:
+            doc = self.documents[i]
+            match = {"id": doc.get("id", str(i)), "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = {"page": doc.get("page"), "context": doc.get("context", "")}
+            matches.append(match)
+        return {"matches": matches}
+
+
+class FakeAsyncPineconeIndex(FakePineconeIndex):
+    """FakePineconeIndex whose query round trip is awaited (see clients.AsyncPineconeIndex)."""
+
+    async def query(self, vector, top_k=10, include_metadata=True, **kwargs):
+        await asyncio.sleep(latency(latency.pinecone))
+        return self._search(vector, top_k, include_metadata)
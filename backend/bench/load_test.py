@@ -0,0 +1,308 @@
+"""
+Closed- and open-loop load generator for /ask and /voice.
+
+Closed loop: `--concurrency` workers send requests back to back.
+Open loop: requests arrive as a Poisson process at `--rate` per second; latency
+is measured from each request's scheduled start, so queueing is not hidden.
+
+With --spawn the server (app, api or asgi) is started here with the fake
+clients from bench/fakes.py, and its CPU time and RSS are sampled from /proc.
+
+Usage (from backend/):
+    python -m bench.load_test --spawn app --route ask --mode closed --concurrency 8 --duration 30
+    python -m bench.load_test --url http://localhost:7860 --route voice --mode open --rate 5
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+QUESTIONS = [
+    "Wer ist Javid Niazi-Hoffmann?",
+    "Wie gewinne ich Traumkunden?",
+    "Wie baue ich ein Coaching-Business auf?",
+    "Wie setze ich meine Preise als Coach fest?",
+    "How do I scale my coaching business?",
+    "What is the best way to find high-paying clients?",
+    "Wie überzeuge ich Interessenten im Verkaufsgespräch?",
+    "How do I build trust with potential clients online?",
+]
+
+SERVERS = {
+    "app": (["app.py"], 7860),
+    "api": (["api.py"], 5000),
+    "asgi": (["-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", "{port}"], 7860),
+}
+# api.py serves only the text routes
+VOICE_SERVERS = {"app", "asgi"}
+
+
+# ---------- Payloads ----------
+def silent_wav(seconds=2.0, rate=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(int(seconds * rate) * 2))
+    return buffer.getvalue()
+
+
+def multipart(field, filename, data, content_type="audio/wav"):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def make_request(url, route, audio):
+    if route == "voice":
+        body, content_type = multipart("audio", "question.wav", audio)
+        return urllib.request.Request(f"{url}/voice", data=body, headers={"Content-Type": content_type})
+    body = json.dumps({"question": random.choice(QUESTIONS)}).encode()
+    return urllib.request.Request(f"{url}/ask", data=body, headers={"Content-Type": "application/json"})
+
+
+def send(url, route, audio, timeout):
+    """One request; returns (ok, status)."""
+    try:
+        with urllib.request.urlopen(make_request(url, route, audio), timeout=timeout) as r:
+            r.read()
+            return 200 <= r.status < 300, r.status
+    except urllib.error.HTTPError as e:
+        return False, e.code
+    except Exception:
+        return False, 0
+
+
+# ---------- Process stats ----------
+class ProcSampler:
+    """Samples CPU time and RSS of a process from /proc (Linux only)."""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.rss_peak = 0
+        self.rss_samples = []
+        self._stop = threading.Event()
+        self._ticks = os.sysconf("SC_CLK_TCK")
+
+    def cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self._ticks  # utime + stime
+
+    def rss_mb(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                rss = self.rss_mb()
+            except OSError:
+                return
+            self.rss_samples.append(rss)
+            self.rss_peak = max(self.rss_peak, rss)
+
+    def start(self):
+        self._cpu_start, self._wall_start = self.cpu_seconds(), time.perf_counter()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        cpu = self.cpu_seconds() - self._cpu_start
+        wall = time.perf_counter() - self._wall_start
+        return {
+            "cpu_seconds": round(cpu, 2),
+            "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+            "rss_mean_mb": round(sum(self.rss_samples) / len(self.rss_samples), 1) if self.rss_samples else 0.0,
+            "rss_peak_mb": round(self.rss_peak, 1),
+        }
+
+
+def spawn_server(name, port):
+    """Start a server with the fake clients and wait until it is ready."""
+    args, default_port = SERVERS[name]
+    port = port or default_port
+    # The questions and the silent clip repeat, so the answer cache and a warm
+    # audio cache from earlier runs would turn every request into a cache hit
+    audio_dir = tempfile.mkdtemp(prefix="load_test_audio_")
+    env = {**os.environ, "USE_FAKE_CLIENTS": "1", "PORT": str(port), "AUDIO_CACHE_DIR": audio_dir}
+    env.setdefault("ANSWER_CACHE_ENABLED", "0")
+    cmd = [sys.executable] + [a.format(port=port) for a in args]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    proc.audio_dir = audio_dir
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url + "/", timeout=2) as r:
+                status = json.load(r).get("startup", {})
+        except Exception:
+            status = {}
+        if status.get("ready"):
+            return proc, url
+        if status.get("finished"):
+            stop_server(proc)
+            raise RuntimeError(f"{name} server started degraded: {status.get('components')}")
+        time.sleep(0.5)
+    stop_server(proc)
+    raise RuntimeError(f"{name} server was not ready within 180s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    proc.wait(timeout=10)
+    shutil.rmtree(proc.audio_dir, ignore_errors=True)
+
+
+# ---------- Load ----------
+def closed_loop(url, route, concurrency, duration, timeout, audio):
+    samples = []
+    lock = threading.Lock()
+    end = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            ok, status = send(url, route, audio, timeout)
+            with lock:
+                samples.append((time.perf_counter() - start, ok, status))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def open_loop(url, route, rate, duration, timeout, audio, max_in_flight):
+    samples = []
+    lock = threading.Lock()
+
+    def fire(scheduled):
+        ok, status = send(url, route, audio, timeout)
+        with lock:
+            samples.append((time.perf_counter() - scheduled, ok, status))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        start = time.perf_counter()
+        scheduled = start
+        while scheduled < start + duration:
+            scheduled += random.expovariate(rate)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, scheduled)
+    return samples
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples, wall):
+    latencies = [s[0] * 1000 for s in samples]
+    errors = sum(1 for s in samples if not s[1])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies, default=0.0), 1),
+        "statuses": {str(k): sum(1 for s in samples if s[2] == k) for k in sorted({s[2] for s in samples})},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /ask and /voice.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server")
+    target.add_argument("--spawn", choices=sorted(SERVERS), help="Start this server with fake clients")
+    parser.add_argument("--port", type=int, help="Port for --spawn")
+    parser.add_argument("--pid", type=int, help="Server pid to sample CPU/RSS for with --url")
+    parser.add_argument("--route", choices=["ask", "voice"], default="ask")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open-loop arrivals per second")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open-loop client threads")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--warmup", type=int, default=3, help="Requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+    if args.route == "voice" and args.spawn and args.spawn not in VOICE_SERVERS:
+        parser.error(f"--route voice needs one of: {', '.join(sorted(VOICE_SERVERS))} ({args.spawn} has no /voice)")
+
+    proc = None
+    url, pid = args.url, args.pid
+    if args.spawn:
+        proc, url = spawn_server(args.spawn, args.port)
+        pid = proc.pid
+        print(f"🚀 Spawned {args.spawn} (pid {pid}) at {url} with fake clients")
+
+    audio = silent_wav(args.audio_seconds)
+    try:
+        for _ in range(args.warmup):
+            send(url, args.route, audio, args.timeout)
+
+        sampler = ProcSampler(pid) if pid else None
+        if sampler:
+            sampler.start()
+        start = time.perf_counter()
+        if args.mode == "closed":
+            samples = closed_loop(url, args.route, args.concurrency, args.duration, args.timeout, audio)
+        else:
+            samples = open_loop(url, args.route, args.rate, args.duration, args.timeout, audio, args.max_in_flight)
+        wall = time.perf_counter() - start
+        server_stats = sampler.stop() if sampler else None
+    finally:
+        if proc:
+            stop_server(proc)
+
+    report = {
+        "route": f"/{args.route}",
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "rate": args.rate if args.mode == "open" else None,
+        "duration_s": round(wall, 2),
+        **summarize(samples, wall),
+        "server": server_stats,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
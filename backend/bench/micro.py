@@ -0,0 +1,120 @@
+"""
+Micro-benchmarks for the hot helpers of the /ask pipeline.
+
+Imports the shared pipeline with the fake clients (no network, zero Pinecone
+latency by default) and times language detection (fast path and cached),
+query encoding (cold and cached), retrieval and format_answers. With --baseline a previous
+JSON report is compared and the run fails when any p50 regressed by more
+than --tolerance.
+
+Usage (from backend/):
+    python -m bench.micro --output bench/micro.json
+    python -m bench.micro --baseline bench/micro.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ["USE_FAKE_CLIENTS"] = "1"
+os.environ.setdefault("FAKE_PINECONE_MS", "0")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "0")
+
+import pipeline as core  # noqa: E402  (must follow the environment setup above)
+from bench.load_test import QUESTIONS, percentile  # noqa: E402
+
+
+def timeit(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return {
+        "n": repeat,
+        "mean_us": round(sum(timings) / len(timings), 1),
+        "p50_us": round(percentile(timings, 50), 1),
+        "p95_us": round(percentile(timings, 95), 1),
+    }
+
+
+def cycle(items):
+    state = {"i": 0}
+
+    def next_item():
+        state["i"] += 1
+        return items[state["i"] % len(items)]
+    return next_item
+
+
+def run(repeat):
+    core.startup.start()
+    if not core.startup.wait(timeout=300):
+        raise SystemExit(f"❌ Startup failed: {core.startup.status()}")
+
+    question = cycle(QUESTIONS)
+    # Distinct strings per call so the embedding cache cannot answer
+    counter = {"n": 0}
+
+    def unique_question():
+        counter["n"] += 1
+        return f"{question()} #{counter['n']}"
+
+    results = core.retriever.retrieve(QUESTIONS[0])
+    answer = "Ein Coach gewinnt Traumkunden durch Positionierung und Vertrauen. " * 8
+
+    benches = {
+        "language_detection": lambda: core.language_identifier.detect(unique_question()),
+        "language_detection_cached": lambda: core.detect_language(QUESTIONS[0]),
+        "encode_uncached": lambda: core.embedder.encode(unique_question()),
+        "encode_cached": lambda: core.embedder.encode(QUESTIONS[0]),
+        # Unique questions so the timings include query encoding, not embedding cache hits
+        "retrieve": lambda: core.retriever.retrieve(unique_question()),
+        "retrieve_context": lambda: core.retrieve_context(unique_question()),
+        "format_answers": lambda: core.format_answers(QUESTIONS[0], answer, results),
+    }
+    return {name: timeit(fn, repeat) for name, fn in benches.items()}
+
+
+def compare(report, baseline, tolerance):
+    """Names of benchmarks whose p50 grew by more than `tolerance` (fraction)."""
+    regressions = []
+    for name, stats in report.items():
+        before = baseline.get(name, {}).get("p50_us")
+        if before and stats["p50_us"] > before * (1 + tolerance):
+            regressions.append(name)
+            print(f"❌ {name}: p50 {before:.1f}µs → {stats['p50_us']:.1f}µs")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the /ask helpers.")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown (fraction)")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    print(f"\n{'benchmark':<20}{'mean µs':>12}{'p50 µs':>12}{'p95 µs':>12}")
+    for name, stats in report.items():
+        print(f"{name:<20}{stats['mean_us']:>12.1f}{stats['p50_us']:>12.1f}{stats['p95_us']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Incremental index builder for the 'Coaching Millionär' dataset.
+
+Replaces pinecone_index.py. Keeps a content-hash manifest per target, so only
+new or changed pages are re-embedded and pages removed from the dataset are
+deleted from the index. Encoding is batched (optionally across processes) and
+uploads are pipelined on a thread pool with retry while the next batch encodes.
+
+Usage:
+    python build_index.py --target pinecone
+    python build_index.py --target local --processes 4
+    python build_index.py --target local --full   # clean reindex: re-embed everything, drop stale ids
+    python build_index.py --no-chunk              # index whole pages
+
+Switching between chunked and whole-page indexing (or from the old
+pinecone_index.py uploads) needs a clean reindex with --full, so no page is
+left in the index next to its own chunks.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
+from retriever.local_retriever import load_documents
+from retriever.chunking import Chunker
+
+DATASET_PATH = "data/coaching_millionaer_dataset.json"
+MODEL_PATH = "./model"
+LOCAL_INDEX_DIR = "data/local_index"
+PINECONE_INDEX_NAME = "ebook"
+
+
+def content_hash(doc) -> str:
+    raw = f"{doc.get('page')}\0{doc['context']}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def plan(documents, manifest):
+    """Split documents into (changed, deleted_ids, hashes) against the manifest."""
+    hashes = {d["id"]: content_hash(d) for d in documents}
+    changed = [d for d in documents if manifest.get(d["id"]) != hashes[d["id"]]]
+    deleted = [doc_id for doc_id in manifest if doc_id not in hashes]
+    return changed, deleted, hashes
+
+
+def with_retry(fn, *args, retries=5, backoff=1.0):
+    """Call fn(*args), retrying with exponential backoff on any exception."""
+    for attempt in range(retries):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            wait = backoff * (2 ** attempt)
+            print(f"⚠️ {e} — retrying in {wait:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(wait)
+
+
+class Encoder:
+    """Batched encoder, optionally fanned out over a multi-process pool."""
+
+    def __init__(self, model_path, processes=1, batch_size=64):
+        self.model = SentenceTransformer(model_path)
+        self.batch_size = batch_size
+        self.pool = None
+        if processes > 1:
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * processes)
+
+    def encode(self, texts):
+        if self.pool is not None:
+            emb = self.model.encode_multi_process(texts, self.pool, batch_size=self.batch_size)
+        else:
+            emb = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        emb = np.asarray(emb, dtype=np.float32)
+        return emb / np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+
+    def close(self):
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+class PineconeTarget:
+    def __init__(self, api_key, index_name, concurrency=4):
+        from pinecone import Pinecone
+        self.index = Pinecone(api_key=api_key).Index(index_name)
+        self.manifest_path = f"data/pinecone_manifest_{index_name}.json"
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.pending = []
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            return load_manifest(self.manifest_path)
+        # First run against an existing index: every id already in it is unknown,
+        # so vectors the dataset no longer produces (e.g. the old whole-page ids) are deleted
+        ids = self.existing_ids()
+        print(f"📋 No manifest yet, seeding it with {len(ids)} ids found in the index.")
+        return {doc_id: None for doc_id in ids}
+
+    def existing_ids(self):
+        try:
+            return [doc_id for page in self.index.list() for doc_id in page]
+        except Exception as e:
+            # list() only exists for serverless indexes; pinecone_index.py uploaded ids "0".."n-1"
+            total = self.index.describe_index_stats().get("total_vector_count", 0)
+            print(f"⚠️ Cannot list index ids ({e}); assuming the legacy ids 0..{total - 1}.")
+            return [str(i) for i in range(total)]
+
+    def upsert(self, docs, embeddings):
+        vectors = [
+            (d["id"], emb.tolist(), {"page": d.get("page"), "context": d["context"]})
+            for d, emb in zip(docs, embeddings)
+        ]
+        self.pending.append(self.executor.submit(with_retry, self.index.upsert, vectors))
+
+    def delete(self, ids, batch_size=1000):
+        # Pinecone accepts at most 1000 ids per delete request
+        for start in range(0, len(ids), batch_size):
+            self.pending.append(self.executor.submit(with_retry, self.index.delete, ids[start:start + batch_size]))
+
+    def finish(self):
+        for future in self.pending:
+            future.result()
+        self.executor.shutdown()
+
+
+class LocalTarget:
+    """Incremental writer for the LocalRetriever store (embeddings.npy + metadata.json)."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.manifest_path = os.path.join(index_dir, "manifest.json")
+        self.rows = {}
+
+        emb_path = os.path.join(index_dir, "embeddings.npy")
+        meta_path = os.path.join(index_dir, "metadata.json")
+        if os.path.exists(emb_path) and os.path.exists(meta_path):
+            embeddings = np.load(emb_path)
+            with open(meta_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            self.rows = {m["id"]: (m, embeddings[i]) for i, m in enumerate(metadata) if "id" in m}
+
+    def load_manifest(self):
+        # The store is the source of truth: rows without a hash are re-embedded
+        manifest = load_manifest(self.manifest_path)
+        return {doc_id: manifest.get(doc_id) for doc_id in self.rows}
+
+    def existing_ids(self):
+        return list(self.rows)
+
+    def upsert(self, docs, embeddings):
+        for d, emb in zip(docs, embeddings):
+            self.rows[d["id"]] = ({"id": d["id"], "page": d.get("page"), "context": d["context"]}, emb)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.rows.pop(doc_id, None)
+
+    def finish(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        ordered = sorted(self.rows.values(), key=lambda row: (len(row[0]["id"]), row[0]["id"]))
+        metadata = [meta for meta, _ in ordered]
+        embeddings = np.vstack([emb for _, emb in ordered]).astype(np.float32) if ordered else np.empty((0, 0), np.float32)
+
+        # Write next to the live files and swap, so running workers never see a partial index
+        emb_tmp = os.path.join(self.index_dir, "embeddings.tmp.npy")
+        meta_tmp = os.path.join(self.index_dir, "metadata.json.tmp")
+        np.save(emb_tmp, embeddings)
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(emb_tmp, os.path.join(self.index_dir, "embeddings.npy"))
+        os.replace(meta_tmp, os.path.join(self.index_dir, "metadata.json"))
+
+
+def build(target, encoder, data_path=DATASET_PATH, upload_batch=100, full=False, chunker=None):
+    started = time.perf_counter()
+    documents = load_documents(data_path)
+    if chunker is not None:
+        pages = len(documents)
+        documents = chunker.chunk_documents(documents)
+        print(f"✂️ Split {pages} pages into {len(documents)} chunks (≤ {chunker.max_tokens} tokens).")
+    manifest = target.load_manifest()
+    if full:
+        # Forget the hashes; every id in the manifest or the index that the
+        # dataset no longer produces (removed pages, whole pages after chunking) is deleted
+        manifest = {doc_id: None for doc_id in {*manifest, *target.existing_ids()}}
+    changed, deleted, hashes = plan(documents, manifest)
+    print(f"📄 {len(documents)} passages: {len(changed)} new/changed, {len(deleted)} deleted, "
+          f"{len(documents) - len(changed)} unchanged.")
+
+    # Encoding the next batch overlaps with the upload of the previous one
+    for start in range(0, len(changed), upload_batch):
+        batch = changed[start:start + upload_batch]
+        target.upsert(batch, encoder.encode([d["context"] for d in batch]))
+        print(f"✅ Encoded {start + len(batch)}/{len(changed)} passages...")
+
+    target.delete(deleted)
+    target.finish()
+    save_manifest(target.manifest_path, hashes)
+    print(f"🎉 Index up to date in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Incrementally build the vector index.")
+    parser.add_argument("--target", choices=["pinecone", "local"], default="pinecone")
+    parser.add_argument("--data", default=DATASET_PATH)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--index-name", default=PINECONE_INDEX_NAME)
+    parser.add_argument("--index-dir", default=LOCAL_INDEX_DIR)
+    parser.add_argument("--processes", type=int, default=1, help="Encoder processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encoder batch size")
+    parser.add_argument("--upload-batch", type=int, default=100, help="Vectors per upsert request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel Pinecone requests")
+    parser.add_argument("--full", action="store_true",
+                        help="Clean reindex: re-embed everything and delete every id the dataset does not produce")
+    parser.add_argument("--no-chunk", action="store_true", help="Index whole pages instead of chunks")
+    parser.add_argument("--chunk-tokens", type=int, help="Tokens per chunk (default: model window)")
+    parser.add_argument("--overlap-tokens", type=int, default=32, help="Tokens shared by neighbouring chunks")
+    args = parser.parse_args()
+
+    if args.target == "pinecone":
+        api_key = os.getenv("PINECONE_API_KEY")
+        if not api_key:
+            raise SystemExit("PINECONE_API_KEY missing in .env")
+        target = PineconeTarget(api_key, args.index_name, args.concurrency)
+    else:
+        target = LocalTarget(args.index_dir)
+
+    encoder = Encoder(args.model, args.processes, args.batch_size)
+    chunker = None
+    if not args.no_chunk:
+        # The window counts [CLS] and [SEP], chunks must leave room for them
+        max_tokens = args.chunk_tokens or encoder.model.max_seq_length - 2
+        chunker = Chunker(encoder.model.tokenizer, max_tokens, args.overlap_tokens)
+    try:
+        build(target, encoder, args.data, args.upload_batch, args.full, chunker)
+    finally:
+        encoder.close()
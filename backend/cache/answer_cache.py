@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+def fingerprint(*parts) -> str:
+    """
+    Hash strings and file contents into a cache version.
+    Parts that are paths to existing files are hashed by content.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        part = str(part)
+        if os.path.isfile(part):
+            with open(part, "rb") as f:
+                h.update(f.read())
+        else:
+            h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache for the /ask pipeline keyed by question-embedding similarity.
+
+    A question whose embedding has cosine similarity >= `threshold` with a
+    cached question in the same language gets the stored answer back, skipping
+    retrieval and the chat completion. Entries expire `ttl` seconds after
+    their last hit and the least recently used are evicted beyond `max_size`;
+    both are O(1) per entry because entries are kept in last-use (and thus
+    expiry) order and every embedding has a fixed row in a preallocated
+    matrix. The whole cache is dropped when
+    the version (dataset + index + prompts fingerprint) changes. With
+    `version_fn` the version is recomputed on lookup at most every
+    `check_interval` seconds, so a rebuilt index or edited dataset takes
+    effect while the server runs.
+    """
+
+    def __init__(self, version: str, threshold: float = 0.95, max_size: int = 512, ttl: float = 86400,
+                 version_fn=None, check_interval: float = 30):
+        self.version = version
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self.check_interval = check_interval
+        self._checked = time.time()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # slot -> entry, least recently used (first to expire) first
+        self._matrix = None  # (max_size, dim); row `slot` holds that entry's unit embedding
+        self._valid = np.zeros(max_size, dtype=bool)
+        self._free = list(range(max_size - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vec):
+        vec = np.asarray(vec, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _evict_oldest(self):
+        slot, _ = self._entries.popitem(last=False)
+        self._valid[slot] = False
+        self._free.append(slot)
+        self.evictions += 1
+
+    def _expire(self):
+        """Drop expired entries from the front; stops at the first live one."""
+        now = time.time()
+        while self._entries and next(iter(self._entries.values()))["expires"] <= now:
+            self._evict_oldest()
+
+    def invalidate(self, version: str = None):
+        """Drop all entries, optionally switching to a new version."""
+        with self._lock:
+            if version is not None:
+                self.version = version
+            self._entries.clear()
+            self._valid[:] = False
+            self._free = list(range(self.max_size - 1, -1, -1))
+
+    def check_version(self, force=False):
+        """Recompute the version and drop the cache when it changed; True if it was dropped."""
+        if self.version_fn is None or (not force and time.time() - self._checked < self.check_interval):
+            return False
+        self._checked = time.time()
+        version = self.version_fn()
+        if version == self.version:
+            return False
+        print(f"♻️ Answer cache version changed ({self.version} → {version}), dropping {len(self._entries)} entries")
+        self.invalidate(version)
+        return True
+
+    def lookup(self, embedding, lang: str):
+        """Return the best cached entry for this question, or None."""
+        self.check_version()
+        query = self._unit(embedding)
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            scores = np.where(self._valid, self._matrix @ query, -np.inf)
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for slot in candidates[np.argsort(-scores[candidates])]:
+                entry = self._entries[slot]
+                if entry["lang"] == lang:
+                    # A hit renews the entry and moves it to the back of the expiry order
+                    entry["expires"] = time.time() + self.ttl
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    return {**entry, "similarity": float(scores[slot])}
+
+            self.misses += 1
+            return None
+
+    def store(self, embedding, lang: str, results, answer: str):
+        unit = self._unit(embedding)
+        with self._lock:
+            self._expire()
+            if not self._free:
+                self._evict_oldest()
+            if self._matrix is None or self._matrix.shape[1] != unit.shape[0]:
+                self._matrix = np.zeros((self.max_size, unit.shape[0]), dtype=np.float32)
+                self._entries.clear()
+                self._valid[:] = False
+                self._free = list(range(self.max_size - 1, -1, -1))
+            slot = self._free.pop()
+            self._matrix[slot] = unit
+            self._valid[slot] = True
+            now = time.time()
+            self._entries[slot] = {
+                "lang": lang,
+                "results": [{"page": r.get("page"), "score": r.get("score", 0.0)} for r in results],
+                "answer": answer,
+                "created": now,
+                "expires": now + self.ttl,
+            }
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class AudioStore:
+    """
+    Content-addressed store for synthesized speech.
+
+    Clips are keyed by sha256(model, voice, text), so an identical answer or
+    sentence is served from disk instead of calling TTS again. Files older than
+    `max_age` seconds are dropped and the least recently used ones are evicted
+    once the store exceeds `max_bytes`. Because a key never changes content,
+    it doubles as a strong ETag for /audio.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, max_age=7 * 86400, suffix=".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> [size, last access]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            key, ext = os.path.splitext(name)
+            if ext == suffix and KEY_PATTERN.match(key):
+                stat = os.stat(os.path.join(directory, name))
+                self._entries[key] = [stat.st_size, stat.st_mtime]
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def key(model: str, voice: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str):
+        """Path of a stored clip, or None when missing, expired or not a valid key."""
+        if not KEY_PATTERN.match(key or ""):
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] > self.max_age:
+                return None
+            entry[1] = time.time()
+        path = os.path.join(self.directory, key + self.suffix)
+        try:
+            os.utime(path)  # keeps LRU order across restarts
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return path
+
+    def get(self, key: str):
+        path = self.path(key)
+        if path is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:  # evicted by a concurrent put
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store a clip atomically and return its path."""
+        path = os.path.join(self.directory, key + self.suffix)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._entries[key] = [len(data), time.time()]
+            self._evict()
+        return path
+
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        expired = [k for k, (_, last) in self._entries.items() if last < cutoff]
+        total = sum(size for size, _ in self._entries.values())
+        by_age = sorted((k for k in self._entries if k not in expired), key=lambda k: self._entries[k][1])
+        for key in expired + by_age:
+            if key not in expired and total <= self.max_bytes:
+                break
+            total -= self._entries.pop(key)[0]
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, key + self.suffix))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._entries),
+                "bytes": sum(size for size, _ in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,180 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different spellings share a cache entry."""
+    return " ".join(str(text).split())
+
+
+class CachedEmbedder:
+    """
+    Query-embedding cache in front of `SentenceTransformer.encode`.
+
+    Lookups go through an in-memory LRU first and then an optional SQLite
+    disk tier keyed by (model id, text hash), so repeated questions skip the
+    transformer forward pass entirely. Unknown attributes are forwarded to the
+    wrapped model, so it can be used anywhere a SentenceTransformer is expected.
+
+    The disk tier runs in WAL mode and commits every `commit_every` writes or
+    `commit_interval` seconds (and at exit) instead of once per put. It keeps
+    at most `disk_max_rows` rows; beyond that the least recently used tenth
+    is deleted.
+    """
+
+    def __init__(self, model, model_id: str, max_size: int = 1024, disk_path: str = None,
+                 disk_max_rows: int = 100_000, commit_every: int = 64, commit_interval: float = 5.0):
+        self.model = model
+        self.model_id = model_id
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_max_rows = disk_max_rows
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.disk_evictions = 0
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vec BLOB, used REAL)"
+            )
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")]
+            if "used" not in columns:  # caches written before eviction existed
+                self._db.execute("ALTER TABLE embeddings ADD COLUMN used REAL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+            self._db.commit()
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            atexit.register(self.flush)
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def _key(self, text: str, options) -> str:
+        raw = "\0".join([self.model_id, repr(options), normalize_text(text)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get(self, key):
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vec
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vec = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                    self._db.execute("UPDATE embeddings SET used = ? WHERE key = ?", (time.time(), key))
+                    self._wrote()
+                    return vec
+
+            self.misses += 1
+            return None
+
+    def _remember(self, key, vec):
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _put(self, key, vec):
+        vec = np.asarray(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        with self._lock:
+            self._remember(key, vec)
+            if self._db is not None:
+                self._disk_rows += self._db.execute(
+                    "INSERT OR IGNORE INTO embeddings (key, dim, vec, used) VALUES (?, ?, ?, ?)",
+                    (key, vec.shape[0], vec.tobytes(), time.time()),
+                ).rowcount
+                if self._disk_rows > self.disk_max_rows:
+                    self._evict()
+                self._wrote()
+        return vec
+
+    def _evict(self):
+        """Drop the least recently used tenth of the disk tier; caller holds the lock."""
+        deleted = self._db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used LIMIT ?)",
+            (self._disk_rows - int(self.disk_max_rows * 0.9),),
+        ).rowcount
+        self._disk_rows -= deleted
+        self.disk_evictions += deleted
+
+    def _wrote(self):
+        """Count a pending disk write and commit in batches; caller holds the lock."""
+        self._pending += 1
+        now = time.monotonic()
+        if self._pending >= self.commit_every or now - self._last_commit >= self.commit_interval:
+            self._db.commit()
+            self._pending = 0
+            self._last_commit = now
+
+    def flush(self):
+        """Commit pending disk writes."""
+        with self._lock:
+            if self._db is not None and self._pending:
+                self._db.commit()
+                self._pending = 0
+                self._last_commit = time.monotonic()
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **kwargs):
+        """Same contract as SentenceTransformer.encode for str or list[str] input."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        options = (normalize_embeddings,)
+
+        keys = [self._key(t, options) for t in texts]
+        vectors = [self._get(k) for k in keys]
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            kwargs.pop("convert_to_numpy", None)
+            encoded = self.model.encode(
+                [texts[i] for i in missing],
+                convert_to_numpy=True,
+                normalize_embeddings=normalize_embeddings,
+                **kwargs,
+            )
+            for i, vec in zip(missing, encoded):
+                vectors[i] = self._put(keys[i], vec)
+
+        if single:
+            return vectors[0]
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        disk = None
+        if self._db is not None:
+            disk = {"rows": self._disk_rows, "max_rows": self.disk_max_rows, "evictions": self.disk_evictions}
+        return {
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "disk": disk,
+        }
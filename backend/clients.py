@@ -0,0 +1,78 @@
+"""
+Factories for the external service clients (OpenAI, Pinecone).
+
+The apps build their clients only through these functions. With
+USE_FAKE_CLIENTS=1 they return the local stand-ins from bench/fakes.py, so the
+whole pipeline runs offline with injected latency for benchmarks and load tests.
+"""
+import os
+
+USE_FAKE_CLIENTS = os.getenv("USE_FAKE_CLIENTS", "0") == "1"
+
+
+def create_openai_client(api_key):
+    """Sync OpenAI client (chat, transcription, speech), or None without a key."""
+    if USE_FAKE_CLIENTS:
+        from bench.fakes import FakeOpenAI
+        return FakeOpenAI()
+    if not api_key:
+        return None
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+
+def create_async_openai_client(api_key):
+    """Async OpenAI client used by the ASGI app, or None without a key."""
+    if USE_FAKE_CLIENTS:
+        from bench.fakes import FakeAsyncOpenAI
+        return FakeAsyncOpenAI()
+    if not api_key:
+        return None
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key)
+
+
+def create_pinecone_index(api_key, index_name):
+    """Pinecone index handle; raises ValueError without a key."""
+    if USE_FAKE_CLIENTS:
+        from bench.fakes import FakePineconeIndex
+        return FakePineconeIndex()
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY missing in .env")
+    from pinecone import Pinecone
+    return Pinecone(api_key=api_key).Index(index_name)
+
+
+class AsyncPineconeIndex:
+    """
+    Query-only async client for the Pinecone data plane on httpx, so the ASGI
+    app awaits vector queries on its event loop instead of blocking a thread
+    on the sync SDK. Responses have the same {"matches": [...]} shape.
+    """
+
+    def __init__(self, api_key, host, timeout=10.0):
+        import httpx
+        self.client = httpx.AsyncClient(
+            base_url=host if host.startswith("http") else f"https://{host}",
+            headers={"Api-Key": api_key, "X-Pinecone-API-Version": "2024-07"},
+            timeout=timeout,
+        )
+
+    async def query(self, vector, top_k=10, include_metadata=True, **kwargs):
+        response = await self.client.post(
+            "/query", json={"vector": vector, "topK": top_k, "includeMetadata": include_metadata}
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+def create_async_pinecone_index(api_key, index_name):
+    """Async query handle for the ASGI app; raises ValueError without a key."""
+    if USE_FAKE_CLIENTS:
+        from bench.fakes import FakeAsyncPineconeIndex
+        return FakeAsyncPineconeIndex()
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY missing in .env")
+    from pinecone import Pinecone
+    host = Pinecone(api_key=api_key).describe_index(index_name).host
+    return AsyncPineconeIndex(api_key, host)
@@ -0,0 +1,160 @@
+"""
+Session-scoped conversation memory for multi-turn /ask.
+
+Prompts are ordered for provider-side prompt caching: the static system
+prompt, then the running summary, then the recent turns (append-only between
+summaries), and only then the new question with its book context. Every
+request in a session therefore shares the longest possible prefix with the
+previous one.
+"""
+import re
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class Session:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.summary = ""
+        self.turns = []  # [(question, answer, tokens)] not yet folded into the summary
+        self.last_used = time.time()
+        self.summarizing = False
+
+
+class ConversationStore:
+    """
+    Bounded store of chat sessions with rolling summarization.
+
+    At most `max_sessions` sessions are kept (least recently used evicted
+    first) and sessions idle for more than `ttl` seconds expire. Once the
+    turns of a session exceed `budget_tokens`, all but the last `keep_turns`
+    are folded into the session summary by `summarize(summary, turns)` on a
+    background thread, so history stays bounded without delaying a request.
+    If summarization fails the old summary is kept and the oldest turns are
+    dropped until the rest fit `budget_tokens` (always keeping the last
+    `keep_turns`), so a failing summarizer cannot let history grow unbounded.
+    """
+
+    def __init__(self, count_tokens, summarize, max_sessions=1000, ttl=3600, budget_tokens=1200, keep_turns=2):
+        self.count_tokens = count_tokens
+        self.summarize = summarize
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarize")
+        self.evictions = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self.turns_dropped = 0
+
+    @staticmethod
+    def session_id(requested=None) -> str:
+        """`requested` when it is a well-formed id, otherwise a new one."""
+        if isinstance(requested, str) and SESSION_ID.match(requested):
+            return requested
+        return uuid.uuid4().hex
+
+    def _get(self, session_id, create):
+        """Session by id, refreshed in LRU order; caller holds the lock."""
+        now = time.time()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used <= self.ttl:
+                break
+            del self._sessions[oldest.id]
+            self.evictions += 1
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = Session(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        self._sessions.move_to_end(session_id)
+        session.last_used = now
+        return session
+
+    def history(self, session_id):
+        """Chat messages of the conversation so far: summary first, then the recent turns."""
+        if not session_id:
+            return []
+        with self._lock:
+            session = self._get(session_id, create=False)
+            if session is None:
+                return []
+            summary, turns = session.summary, list(session.turns)
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        for question, answer, _ in turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def record(self, session_id, question: str, answer: str):
+        """Append one turn; schedules summarization once the session is over budget."""
+        if not session_id:
+            return
+        tokens = self.count_tokens(question) + self.count_tokens(answer)
+        with self._lock:
+            session = self._get(session_id, create=True)
+            session.turns.append((question, answer, tokens))
+            if session.summarizing or len(session.turns) <= self.keep_turns:
+                return
+            if sum(t[2] for t in session.turns) <= self.budget_tokens:
+                return
+            session.summarizing = True
+        self._summarizer.submit(self._compact, session)
+
+    def _compact(self, session):
+        with self._lock:
+            folded = session.turns[:len(session.turns) - self.keep_turns]
+            summary = session.summary
+        try:
+            summary = self.summarize(summary, [(q, a) for q, a, _ in folded])
+        except Exception:
+            traceback.print_exc()
+            with self._lock:
+                self.summary_failures += 1
+                self._trim(session)
+                session.summarizing = False
+            return
+        with self._lock:
+            self.summaries += 1
+            # Turns recorded while summarizing stay behind the folded ones
+            del session.turns[:len(folded)]
+            session.summary = summary
+            session.summarizing = False
+
+    def _trim(self, session):
+        """Drop the oldest turns until the rest fit the budget; caller holds the lock."""
+        total = sum(t[2] for t in session.turns)
+        drop = 0
+        while total > self.budget_tokens and len(session.turns) - drop > self.keep_turns:
+            total -= session.turns[drop][2]
+            drop += 1
+        del session.turns[:drop]
+        self.turns_dropped += drop
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "evictions": self.evictions,
+                "summaries": self.summaries,
+                "summary_failures": self.summary_failures,
+                "turns_dropped": self.turns_dropped,
+            }
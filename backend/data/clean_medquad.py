@@ -1,37 +1,99 @@
+"""
+Streaming MedQuAD cleaner.
 
-import pandas as pd
+Reads the CSV in chunks, strips and drops incomplete rows with vectorized
+string ops, and removes duplicate (question, answer) pairs across the whole
+file via 64-bit row hashes, so peak memory is one chunk plus 8 bytes per
+kept row. Deduplication is vectorized: Index.duplicated within a chunk,
+np.isin against the sorted hashes kept so far across chunks. Output is JSON
+Lines (default), a memory-mapped columnar directory or the legacy JSON
+array; see retriever/corpus.py for the loaders.
+
+Usage (from backend/):
+    python -m data.clean_medquad
+    python -m data.clean_medquad --format columnar --output data/medquad_cleaned.cols
+"""
+import argparse
 import json
 import os
+import time
+import numpy as np
+import pandas as pd
+from retriever.corpus import ColumnarWriter, JsonlWriter
 
 # Input and output paths
 input_csv_path = "data/medquad.csv"
-output_json_path = "data/medquad_cleaned.json"
-
-# Make sure output directory exists
-os.makedirs(os.path.dirname(output_json_path), exist_ok=True)
-
-# Load CSV
-df = pd.read_csv(input_csv_path)
-
-# Basic cleaning
-df.dropna(subset=["question", "answer"], inplace=True)
-df["question"] = df["question"].str.strip()
-df["answer"] = df["answer"].str.strip()
-df["source"] = df["source"].fillna("").str.strip()
-df.drop_duplicates(subset=["question", "answer"], inplace=True)
-
-# Convert to list of dicts
-cleaned_data = [
-    {
-        "title": row["question"],
-        "context": row["answer"],
-        "source": row["source"]
-    }
-    for _, row in df.iterrows()
-]
-
-# Save as JSON
-with open(output_json_path, "w", encoding="utf-8") as f:
-    json.dump(cleaned_data, f, indent=2)
-
-print(f"✅ Cleaned data saved to: {output_json_path}")
+OUTPUT_PATHS = {
+    "jsonl": "data/medquad_cleaned.jsonl",
+    "columnar": "data/medquad_cleaned.cols",
+    "json": "data/medquad_cleaned.json",
+}
+CHUNK_SIZE = 5000
+
+
+class JsonArrayWriter:
+    """Legacy single-array output, written incrementally."""
+
+    def __init__(self, path):
+        self._f = open(path, "w", encoding="utf-8")
+        self._f.write("[")
+        self._first = True
+
+    def write(self, records):
+        for r in records:
+            self._f.write(("\n" if self._first else ",\n") + json.dumps(r, ensure_ascii=False))
+            self._first = False
+
+    def close(self):
+        self._f.write("\n]\n")
+        self._f.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "columnar": ColumnarWriter, "json": JsonArrayWriter}
+
+
+def clean_chunk(df, seen):
+    """
+    Cleaned records of one chunk and the updated `seen`, the sorted uint64
+    hashes of all rows kept so far.
+    """
+    df = df.dropna(subset=["question", "answer"])
+    question = df["question"].astype(str).str.strip()
+    answer = df["answer"].astype(str).str.strip()
+    source = df["source"].fillna("").astype(str).str.strip() if "source" in df else pd.Series("", index=df.index)
+
+    hashes = pd.util.hash_pandas_object(pd.DataFrame({"q": question, "a": answer}), index=False).to_numpy()
+    keep = ~pd.Index(hashes).duplicated() & ~np.isin(hashes, seen)
+    seen = np.union1d(seen, hashes[keep])
+
+    out = pd.DataFrame({"title": question[keep], "context": answer[keep], "source": source[keep]})
+    return out.to_dict("records"), seen
+
+
+def clean(input_path, output_path, fmt="jsonl", chunk_size=CHUNK_SIZE):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    writer = WRITERS[fmt](output_path)
+    seen, rows, kept = np.empty(0, dtype=np.uint64), 0, 0
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size, dtype=str):
+            records, seen = clean_chunk(chunk, seen)
+            writer.write(records)
+            rows += len(chunk)
+            kept += len(records)
+    finally:
+        writer.close()
+    return rows, kept
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean and deduplicate the MedQuAD CSV.")
+    parser.add_argument("--input", default=input_csv_path)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    parser.add_argument("--output", help="Defaults to data/medquad_cleaned.<format>")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    output_path = args.output or OUTPUT_PATHS[args.format]
+    start = time.perf_counter()
+    rows, kept = clean(args.input, output_path, args.format, args.chunk_size)
+    print(f"✅ Cleaned data saved to: {output_path} ({kept}/{rows} rows kept, {time.perf_counter() - start:.1f}s)")
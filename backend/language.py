@@ -0,0 +1,183 @@
+"""
+Language identification and translation for the /ask pipeline.
+
+Nearly all questions are German or English, so LanguageIdentifier decides
+those from umlauts and stopword counts in microseconds and only hands
+ambiguous text to langdetect (seeded, so results are deterministic). Both
+detections and translations are cached by text.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+GERMAN_CHARS = re.compile(r"[äöüßÄÖÜ]")
+
+# Words that are frequent in one language and rare in the other ("was", "in",
+# "die", "will", "also", "an", "am" are deliberately missing: they exist in both;
+# topic words such as "kunden"/"clients" are left out as they say nothing about the language)
+GERMAN_STOPWORDS = frozenset("""
+    der das den dem des ein eine einen einem einer und oder aber ist sind bin bist war waren
+    ich du er sie wir ihr mich mir dich dir uns euch mein meine meinen meiner dein deine sich
+    nicht kein keine mit für auf bei zu zum zur von vom aus nach über unter durch gegen ohne
+    wie wer wo wann warum wieso weshalb welche welcher welches kann können kannst muss müssen
+    soll sollte sollen wird werden wurde habe hast haben hat möchte würde gibt noch nur schon
+    sehr mehr viel viele auch wenn dass denn weil bitte antworte deutsch
+""".split())
+ENGLISH_STOPWORDS = frozenset("""
+    the a and or but is are be been being were of to for with on at by from about into
+    through over without i you he she we they me my your his her our their them it its this that
+    these those what who where when why which how can could should would do does did have has
+    had not no get find best way please reply english
+""".split())
+
+# langdetect often reads short German questions as Dutch
+GERMAN_HINTS = ("wer", "was", "wie", "javid", "coaching")
+
+
+class LanguageIdentifier:
+    """
+    Cached language identification with a German/English fast path.
+
+    Text with umlauts or ß, or with at least `min_hits` stopwords of one
+    language and `ratio` times as many as of the other, is decided without a
+    model. Everything else goes to langdetect, imported once and seeded so the
+    same text always gets the same language. Results (language, confidence)
+    are kept in an LRU cache of `cache_size` texts.
+    """
+
+    def __init__(self, cache_size=4096, min_hits=2, ratio=2.0):
+        self.cache_size = cache_size
+        self.min_hits = min_hits
+        self.ratio = ratio
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._langdetect = None
+        self.hits = 0
+        self.fast_path = 0
+        self.model_calls = 0
+
+    def _fast_path(self, text):
+        words = WORD.findall(text.lower())
+        de = sum(w in GERMAN_STOPWORDS for w in words) + (2 if GERMAN_CHARS.search(text) else 0)
+        en = sum(w in ENGLISH_STOPWORDS for w in words)
+        if de >= self.min_hits and de >= self.ratio * en:
+            return "de", de / (de + en)
+        if en >= self.min_hits and en >= self.ratio * de:
+            return "en", en / (de + en)
+        return None
+
+    def warmup(self):
+        """Import langdetect and load its language profiles before the first ambiguous question."""
+        self._model("Hallo")
+
+    def _model(self, text):
+        if self._langdetect is None:
+            from langdetect import DetectorFactory, detect_langs
+            DetectorFactory.seed = 0
+            self._langdetect = detect_langs
+        try:
+            best = self._langdetect(text)[0]
+        except Exception:
+            return "unknown", 0.0
+        if best.lang == "nl" and any(word in text.lower() for word in GERMAN_HINTS):
+            return "de", best.prob
+        return best.lang, best.prob
+
+    def lookup(self, text: str):
+        """(language, confidence) from the cache or the fast path, or None when the model is needed."""
+        key = text.strip()
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+        result = self._fast_path(key)
+        if result is not None:
+            with self._lock:
+                self.fast_path += 1
+            self._store(key, result)
+        return result
+
+    def detect(self, text: str, with_confidence=False):
+        """ISO 639-1 code ("unknown" when undetectable), or (code, confidence) with `with_confidence`."""
+        result = self.lookup(text)
+        if result is None:
+            key = text.strip()
+            result = self._model(key)
+            with self._lock:
+                self.model_calls += 1
+            self._store(key, result)
+        return result if with_confidence else result[0]
+
+    def _store(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.fast_path + self.model_calls
+            return {
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+                "hits": self.hits,
+                "fast_path": self.fast_path,
+                "model_calls": self.model_calls,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedTranslator:
+    """
+    GoogleTranslator (deep-translator) with one reused instance per target
+    language and an LRU cache of translations. Failed translations return the
+    input unchanged and are not cached.
+    """
+
+    def __init__(self, cache_size=1024):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._translators = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _translator(self, target_lang):
+        with self._lock:
+            translator = self._translators.get(target_lang)
+        if translator is None:
+            from deep_translator import GoogleTranslator
+            translator = GoogleTranslator(source="auto", target=target_lang)
+            with self._lock:
+                translator = self._translators.setdefault(target_lang, translator)
+        return translator
+
+    def translate(self, text: str, target_lang: str) -> str:
+        key = (target_lang, text)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        try:
+            translated = self._translator(target_lang).translate(text)
+        except Exception:
+            return text
+        if not translated:
+            return text
+        with self._lock:
+            self._cache[key] = translated
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return translated
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._cache), "hits": self.hits, "misses": self.misses,
+                    "translators": len(self._translators)}
@@ -1,11 +1,94 @@
 
-from retriever.bm25_retriever import BM25Retriever
-from qa.biobert_qa import BioBERTAnswerExtractor
+"""
+MedBot CLI: a thin client for medbot_server.py.
+
+Retrieval and BioBERT stay loaded in the server, so this starts instantly.
+If no server is listening one is started in the background (log in
+MEDBOT_LOG) and reused by later sessions.
+
+    python main.py                           # interactive
+    python main.py "What causes glaucoma?"   # one-shot, for scripts
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+MEDBOT_URL = os.getenv("MEDBOT_URL", f"http://127.0.0.1:{os.getenv('MEDBOT_PORT', 5050)}")
+MEDBOT_LOG = os.getenv("MEDBOT_LOG", "medbot_server.log")
+STARTUP_TIMEOUT = int(os.getenv("MEDBOT_STARTUP_TIMEOUT", 300))  # seconds
+
+
+def server_ready(url):
+    try:
+        with urllib.request.urlopen(url + "/", timeout=2) as r:
+            return r.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def ensure_server(url):
+    """Start medbot_server.py in the background unless one is already up."""
+    if server_ready(url):
+        return
+    print("⏳ Starting MedBot server (first launch loads BM25 and BioBERT)...")
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, MEDBOT_LOG), "ab") as log:
+        proc = subprocess.Popen([sys.executable, "medbot_server.py"], cwd=here,
+                                stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"❌ MedBot server exited with code {proc.returncode}, see {MEDBOT_LOG}")
+        if server_ready(url):
+            return
+        time.sleep(0.5)
+    raise SystemExit(f"❌ MedBot server did not start within {STARTUP_TIMEOUT}s, see {MEDBOT_LOG}")
+
+
+def ask(url, question, top_k):
+    body = json.dumps({"question": question, "top_k": top_k}).encode("utf-8")
+    req = urllib.request.Request(url + "/ask", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as r:
+            return json.load(r)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+
+def print_answers(response):
+    if "error" in response:
+        print(f"⚠️ {response['error']}")
+        return
+    print("\n🔍 Best answers:")
+    for idx, item in enumerate(response["results"], 1):
+        print(f"\nResult {idx}")
+        print(f"Q: {item['title']}")
+        print(f"A: {item['answer']}")
+        print(f"Source: {item['source']} (BM25 Score: {item['score']:.2f})")
+
 
 def main():
-    # Initialize retriever and QA model
-    retriever = BM25Retriever("data/medquad_cleaned.json")
-    qa = BioBERTAnswerExtractor()
+    parser = argparse.ArgumentParser(description="Ask MedBot medical questions.")
+    parser.add_argument("question", nargs="*", help="Ask once and exit (interactive when omitted)")
+    parser.add_argument("--url", default=MEDBOT_URL)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON response")
+    args = parser.parse_args()
+
+    ensure_server(args.url)
+
+    if args.question:
+        response = ask(args.url, " ".join(args.question), args.top_k)
+        if args.json:
+            print(json.dumps(response, ensure_ascii=False, indent=2))
+        else:
+            print_answers(response)
+        return
 
     print("\n🩺 MedBot is ready! Type your question or 'exit' to quit.")
 
@@ -14,19 +97,8 @@ def main():
         if question.lower() in {"exit", "quit"}:
             print("👋 Goodbye!")
             break
-
-        # Step 1: Retrieve top 3 passages
-        results = retriever.retrieve(question, top_k=3)
-
-        # Step 2: Run BioBERT on each passage
-        print("\n🔍 Best answers:")
-        for idx, item in enumerate(results, 1):
-            context = item["context"]
-            answer = qa.extract_answer(question, context)
-            print(f"\nResult {idx}")
-            print(f"Q: {item['title']}")
-            print(f"A: {answer}")
-            print(f"Source: {item['source']} (BM25 Score: {item['score']:.2f})")
+        if question:
+            print_answers(ask(args.url, question, args.top_k))
 
 if __name__ == "__main__":
     main()
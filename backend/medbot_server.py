@@ -0,0 +1,79 @@
+"""
+Long-lived MedBot service: BM25 retriever + BioBERT loaded once, queried over HTTP.
+
+main.py is a thin client for this server (and starts it when nothing is
+listening), so interactive sessions and scripts skip the model load.
+
+    python medbot_server.py            # listens on MEDBOT_PORT (default 5050)
+"""
+import os
+import threading
+import time
+from flask import Flask, request, jsonify
+from retriever.bm25_retriever import BM25Retriever
+from retriever.corpus import MEDQUAD_PATHS, first_existing
+from qa.biobert_qa import BioBERTAnswerExtractor
+
+# ---------- Config ----------
+# .json, .jsonl or .cols; by default the .jsonl, or the .json an older cleaner wrote
+MEDQUAD_PATH = os.getenv("MEDQUAD_PATH") or first_existing(MEDQUAD_PATHS)
+MEDBOT_HOST = os.getenv("MEDBOT_HOST", "127.0.0.1")
+MEDBOT_PORT = int(os.getenv("MEDBOT_PORT", 5050))
+QA_THREADS = int(os.getenv("QA_THREADS", "0")) or None  # default: torch decides
+MAX_TOP_K = 20
+
+# ---------- Pipeline ----------
+started = time.perf_counter()
+retriever = BM25Retriever(MEDQUAD_PATH)
+qa = BioBERTAnswerExtractor(num_threads=QA_THREADS)
+qa_lock = threading.Lock()  # one forward pass at a time; torch already uses all threads
+startup_s = time.perf_counter() - started
+print(f"✅ MedBot pipeline ready in {startup_s:.1f}s ({len(retriever.data)} passages)")
+
+
+def answer(question, top_k=3):
+    timings = {}
+    start = time.perf_counter()
+    results = retriever.retrieve(question, top_k=top_k)
+    timings["retrieve_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    with qa_lock:
+        answers = qa.extract_answers(question, [item["context"] for item in results])
+    timings["qa_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    return {
+        "question": question,
+        "results": [
+            {"title": item["title"], "answer": a["answer"], "context": item["context"],
+             "source": item["source"], "score": item["score"]}
+            for item, a in zip(results, answers)
+        ],
+        "timings": timings,
+    }
+
+
+# ---------- App ----------
+app = Flask(__name__)
+
+
+@app.route("/", methods=["GET"])
+def health():
+    return jsonify({"status": "ok", "passages": len(retriever.data), "startup_s": round(startup_s, 2)})
+
+
+@app.route("/ask", methods=["POST"])
+def ask():
+    data = request.get_json(silent=True) or {}
+    question = (data.get("question") or "").strip()
+    if not question:
+        return jsonify({"error": "Please enter a question."}), 400
+    try:
+        top_k = max(1, min(int(data.get("top_k", 3)), MAX_TOP_K))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k must be an integer."}), 400
+    return jsonify(answer(question, top_k))
+
+
+if __name__ == "__main__":
+    app.run(host=MEDBOT_HOST, port=MEDBOT_PORT, threaded=True)
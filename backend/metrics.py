@@ -0,0 +1,199 @@
+"""
+Request tracing and Prometheus-style metrics for the CoachingBot backend.
+
+span("stage") times one pipeline stage into a latency histogram and into the
+current request's trace; each finished request is logged as one JSON line with
+its request id, per-stage timings and token usage. render() produces the text
+exposition format served on /metrics.
+"""
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, c in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + (bound,))} {c}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self, prefix="coachingbot"):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(f"{self.prefix}_{name}", help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(f"{self.prefix}_{name}", help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, name, fn):
+        """Export the numeric fields of fn() (e.g. a cache's stats()) as gauges."""
+        self._collectors.append((f"{self.prefix}_{name}", fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, fn in self._collectors:
+            try:
+                stats = fn() or {}
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {name}_{key} gauge")
+                lines.append(f"{name}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+REQUESTS = registry.counter("requests_total", "HTTP requests by route and status.", ("route", "status"))
+REQUEST_SECONDS = registry.histogram("request_seconds", "End-to-end request latency.", ("route",))
+STAGE_SECONDS = registry.histogram("stage_seconds", "Latency per pipeline stage.", ("stage",))
+ERRORS = registry.counter("errors_total", "Errors per pipeline stage.", ("stage",))
+TOKENS = registry.counter("llm_tokens_total", "Chat completion token usage.", ("kind",))
+
+
+# ---------- Request traces ----------
+_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    def __init__(self, request_id=None):
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tokens = {}
+        self.fields = {}
+
+    def add_stage(self, stage, ms):
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + ms, 2)
+
+
+def begin_request(request_id=None) -> RequestTrace:
+    trace = RequestTrace(request_id)
+    _trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _trace.get()
+
+
+def resume(trace):
+    """Make `trace` current again, e.g. in a streamed body iterated by another task."""
+    _trace.set(trace)
+
+
+def annotate(**fields):
+    """Attach extra fields (cache hit, language, ...) to the current request log."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def end_request(trace, route, status):
+    """Record request metrics and print one structured log line."""
+    seconds = time.perf_counter() - trace.started
+    REQUESTS.inc(route=route, status=status)
+    REQUEST_SECONDS.observe(seconds, route=route)
+    print(json.dumps({
+        "request_id": trace.request_id,
+        "route": route,
+        "status": status,
+        "duration_ms": round(seconds * 1000, 2),
+        "stages_ms": trace.stages,
+        "tokens": trace.tokens,
+        **trace.fields,
+    }, ensure_ascii=False))
+
+
+@contextmanager
+def span(stage):
+    """Time one pipeline stage; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=stage)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add_stage(stage, seconds * 1000)
+
+
+def record_usage(usage):
+    """Count prompt/completion tokens from an OpenAI usage object."""
+    if usage is None:
+        return
+    trace = _trace.get()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            TOKENS.inc(value, kind=kind.replace("_tokens", ""))
+            if trace is not None:
+                trace.tokens[kind] = trace.tokens.get(kind, 0) + value
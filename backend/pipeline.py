@@ -0,0 +1,489 @@
+"""
+Shared /ask pipeline of the CoachingBot backend.
+
+Config, service clients, embedder, retriever, caches, prompts, conversation
+memory and the sync answer functions live here, so app.py (Flask + voice),
+api.py (Flask) and asgi.py (Quart) import the same pipeline without importing
+each other's web apps. Nothing loads on import: each server registers any
+extra components and calls `startup.start()`.
+"""
+import os
+import json
+import time
+import tempfile
+import traceback
+from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
+from retriever.local_retriever import LocalRetriever, load_documents
+from retriever.hybrid_retriever import HybridRetriever
+from cache.embedding_cache import CachedEmbedder
+from retriever.batching_embedder import BatchingEmbedder
+from retriever.chunking import load_chunker, unique_pages
+from retriever.context_packer import ContextPacker
+from cache.answer_cache import SemanticAnswerCache, fingerprint
+from conversation import ConversationStore
+from language import LanguageIdentifier, CachedTranslator
+from cache.audio_store import AudioStore
+from startup import Startup
+from clients import USE_FAKE_CLIENTS, create_openai_client, create_pinecone_index
+from metrics import registry, span, annotate, record_usage
+
+# ---------- Config ----------
+DATASET_PATH = "data/coaching_millionaer_dataset.json"
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")  # Add this to your .env
+PINECONE_INDEX_NAME = "ebook"
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "pinecone").lower()  # "pinecone" or "local"
+LOCAL_MODEL_PATH = "./model"
+LOCAL_INDEX_DIR = "data/local_index"
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "0") == "1"  # BM25 + dense fusion
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")  # "rrf" or "weighted"
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 1024))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")  # optional SQLite disk tier
+EMBEDDING_CACHE_DISK_ROWS = int(os.getenv("EMBEDDING_CACHE_DISK_ROWS", 100_000))
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx" (int8, bundled model)
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "model/onnx/model.int8.onnx")
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"  # coalesce concurrent encodes
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", 5))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", 32))
+EMBED_MAX_QUEUE = int(os.getenv("EMBED_MAX_QUEUE", 256))
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))  # cosine similarity
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 512))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 86400))  # seconds
+ANSWER_CACHE_CHECK_INTERVAL = int(os.getenv("ANSWER_CACHE_CHECK_INTERVAL", 30))  # seconds between version checks
+RETRIEVE_TOP_K = 10  # passages fetched before the score filter and the token budget
+CHAT_MODEL = "gpt-4o-mini"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))  # book context tokens per prompt
+STARTUP_RETRY_AFTER = int(os.getenv("STARTUP_RETRY_AFTER", 5))  # seconds, sent while loading
+LANGUAGE_CACHE_SIZE = int(os.getenv("LANGUAGE_CACHE_SIZE", 4096))  # detected languages by question text
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 1024))
+SESSION_MAX = int(os.getenv("SESSION_MAX", 1000))  # conversations kept in memory (LRU)
+SESSION_TTL = int(os.getenv("SESSION_TTL", 3600))  # seconds of inactivity before a session expires
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1200))  # verbatim turns before summarizing
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 2))  # latest turns never summarized
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", 250))
+TTS_MODEL = "gpt-4o-mini-tts"
+TTS_VOICE = os.getenv("TTS_VOICE", "alloy")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))  # parallel sentence syntheses for /voice/stream
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "coachingbot_audio"))
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", 200))
+AUDIO_CACHE_TTL = int(os.getenv("AUDIO_CACHE_TTL", 7 * 86400))  # seconds
+
+
+# ---------- OpenAI Client ----------
+client = create_openai_client(OPENAI_API_KEY)
+if USE_FAKE_CLIENTS:
+    print("🧪 Using local fake OpenAI/Pinecone clients (USE_FAKE_CLIENTS=1)")
+elif not client:
+    print("⚠️  OPENAI_API_KEY is missing in .env")
+
+# ---------- Retriever ----------
+class PineconeRetriever:
+    def __init__(self, index, embedder):
+        self.index = index
+        self.embedder = embedder
+
+    def retrieve(self, query, top_k=10):
+        emb = self.embedder.encode(query).tolist()
+        return self.to_results(self.index.query(vector=emb, top_k=top_k, include_metadata=True))
+
+    @staticmethod
+    def to_results(res):
+        """{"id", "context", "page", "score"} results of a Pinecone query response."""
+        matches = res.get("matches", [])
+        results = []
+        for match in matches:
+            meta = match.get("metadata", {})
+            results.append({
+                "id": match.get("id"),
+                "context": meta.get("context", ""),
+                "page": meta.get("page"),
+                "score": match.get("score", 0)
+            })
+        return results
+
+embedding_batcher = None
+
+def load_embedder(model_name: str):
+    """Load the query embedder: SentenceTransformer/ONNX → micro-batcher → embedding cache."""
+    global embedding_batcher
+    if EMBEDDING_BACKEND == "onnx":
+        # The ONNX export is the bundled MiniLM, the same model the hub name points to
+        from retriever.onnx_embedder import OnnxEmbedder
+        model = OnnxEmbedder(LOCAL_MODEL_PATH, ONNX_MODEL_PATH)
+        model_name = f"{LOCAL_MODEL_PATH}:onnx:{os.path.basename(ONNX_MODEL_PATH)}"
+    else:
+        model = SentenceTransformer(model_name)
+    if EMBED_BATCHING:
+        model = embedding_batcher = BatchingEmbedder(
+            model, max_batch_size=EMBED_MAX_BATCH,
+            window_ms=EMBED_BATCH_WINDOW_MS, max_queue=EMBED_MAX_QUEUE
+        )
+    return CachedEmbedder(model, model_name, max_size=EMBEDDING_CACHE_SIZE, disk_path=EMBEDDING_CACHE_PATH,
+                          disk_max_rows=EMBEDDING_CACHE_DISK_ROWS)
+
+embedder = None
+retriever = None
+
+def init_embedder():
+    """Load the bundled query embedder and run a warmup encode."""
+    global embedder
+    embedder = load_embedder(LOCAL_MODEL_PATH)
+    embedder.model.encode(["Wer ist Javid Niazi-Hoffmann?"])  # warmup, bypasses the cache
+
+def init_retriever():
+    global retriever
+    if embedder is None:
+        raise RuntimeError("embedder is not loaded")
+    if RETRIEVER_BACKEND == "local":
+        dense = LocalRetriever(embedder, LOCAL_INDEX_DIR)
+    else:
+        dense = PineconeRetriever(create_pinecone_index(PINECONE_API_KEY, PINECONE_INDEX_NAME), embedder)
+
+    if HYBRID_RETRIEVAL:
+        # BM25 must see the same passages and ids as the dense index, so fusion joins on the id
+        meta_path = os.path.join(LOCAL_INDEX_DIR, "metadata.json")
+        if RETRIEVER_BACKEND == "local" and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                documents = json.load(f)
+        else:
+            # Pinecone: re-chunk the dataset exactly like build_index.py did
+            documents = load_chunker(LOCAL_MODEL_PATH).chunk_documents(load_documents(DATASET_PATH))
+        dense = HybridRetriever(dense, documents, fusion=HYBRID_FUSION)
+    retriever = dense
+
+# ---------- Language ----------
+# De/en questions are decided by a stopword/umlaut fast path; langdetect only sees ambiguous text
+language_identifier = LanguageIdentifier(cache_size=LANGUAGE_CACHE_SIZE)
+translator = CachedTranslator(cache_size=TRANSLATION_CACHE_SIZE)
+
+def translate_text(text: str, target_lang: str) -> str:
+    """Translate text using deep-translator (GoogleTranslator), reusing instances and caching results."""
+    return translator.translate(text, target_lang)
+
+def detect_language(question: str) -> str:
+    """Detect the user's language without translation (cached)."""
+    return language_identifier.detect(question)
+
+def system_prompt() -> str:
+    # One static prompt for every request, so it stays a cacheable prefix
+    return (
+        "You are CoachingBot, a professional business and life mentor trained on the book 'Coaching Millionär' by Javid Niazi-Hoffmann. "
+        "When book context is provided, use only that context to answer the question. "
+        "If the user asks about people like Javid Niazi-Hoffmann, describe them factually using the book content. "
+        "Mention page numbers where possible. "
+        "If the context is not relevant, say you don’t have that information in the book and provide a general, helpful answer. "
+        "Always respond in the same language as the user's question, even if the book content is in another language. "
+        "Do not invent book citations."
+    )
+
+def fallback_instruction() -> str:
+    return (
+        "No book context was found for this question, so answer using your general coaching knowledge "
+        "and do not cite the book."
+    )
+
+# ---------- Context Packer ----------
+context_packer = None
+
+def init_context_packer():
+    global context_packer
+    context_packer = ContextPacker(model=CHAT_MODEL, budget_tokens=CONTEXT_TOKEN_BUDGET)
+
+# ---------- Answer Cache ----------
+def answer_cache_version() -> str:
+    """Fingerprint of everything an answer depends on; the dataset and index manifests are hashed by content."""
+    return fingerprint(
+        DATASET_PATH, os.path.join(LOCAL_INDEX_DIR, "manifest.json"),
+        f"data/pinecone_manifest_{PINECONE_INDEX_NAME}.json",
+        RETRIEVER_BACKEND, HYBRID_RETRIEVAL, CHAT_MODEL, CONTEXT_TOKEN_BUDGET,
+        system_prompt(), fallback_instruction()
+    )
+
+answer_cache = None
+if ANSWER_CACHE_ENABLED:
+    # Any change to the dataset, index, prompts or model starts a fresh cache
+    answer_cache = SemanticAnswerCache(
+        version=answer_cache_version(),
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_size=ANSWER_CACHE_SIZE,
+        ttl=ANSWER_CACHE_TTL,
+        version_fn=answer_cache_version,
+        check_interval=ANSWER_CACHE_CHECK_INTERVAL,
+    )
+
+# ---------- Conversations ----------
+def summarize_conversation(summary: str, turns) -> str:
+    """Fold older turns into the running session summary (one short completion)."""
+    transcript = "\n\n".join(f"User: {q}\nCoachingBot: {a}" for q, a in turns)
+    with span("summarize"):
+        response = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": (
+                    "Update the summary of a coaching conversation with the new turns. "
+                    "Keep the user's goals, situation, open questions and the advice already given. "
+                    "Write at most 150 words in the language of the conversation."
+                )},
+                {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+    record_usage(response.usage)
+    return response.choices[0].message.content.strip()
+
+conversations = ConversationStore(
+    count_tokens=lambda text: context_packer.count(text),
+    summarize=summarize_conversation,
+    max_sessions=SESSION_MAX,
+    ttl=SESSION_TTL,
+    budget_tokens=HISTORY_TOKEN_BUDGET,
+    keep_turns=HISTORY_KEEP_TURNS,
+)
+
+def format_answers(question: str, answer: str, results):
+    # Several chunks of the same page are cited once
+    pages = [f"Seite {page}" for page in unique_pages(results)]
+    source = ", ".join(pages) if pages else "No source"
+    top_score = max([r.get("score", 0.0) for r in results], default=0.0)
+    return {"answers": [{"question": question, "answer": answer, "source": source, "bm25_score": top_score}]}
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def retrieve_context(question: str):
+    """Retrieve book passages above the minimum similarity score, packed into the token budget."""
+    # Encoding first fills the embedding cache, so the retriever's own encode is a hit
+    # and the vector_query span measures the index lookup alone
+    with span("encode"):
+        retriever.embedder.encode(question)
+    with span("vector_query"):
+        raw_results = retriever.retrieve(question, top_k=RETRIEVE_TOP_K)
+    return pack_context(raw_results)
+
+MIN_SCORE = 0.10  # dense similarity; Pinecone similarity scores are normalized (0–1)
+
+def relevant_passages(raw_results):
+    """
+    Passages whose dense similarity reaches MIN_SCORE. Fused hybrid scores are
+    rank-based and would always pass, so hybrid results are judged on their
+    `dense_score`; BM25-only hits have none and are kept only when some dense
+    hit passed, i.e. when the book is relevant to the question at all.
+    """
+    def dense_score(r):
+        if "dense_score" in r:
+            return r["dense_score"]
+        return None if "bm25_score" in r else r.get("score", 0)
+
+    scores = [dense_score(r) for r in raw_results]
+    if not any(score is not None and score >= MIN_SCORE for score in scores):
+        return []
+    return [r for r, score in zip(raw_results, scores) if score is None or score >= MIN_SCORE]
+
+def pack_context(raw_results):
+    """Drop passages below the minimum similarity score and pack the rest into the token budget."""
+    results = relevant_passages(raw_results)
+    with span("prompt_build"):
+        results, stats = context_packer.pack(results)
+    print(f"📦 Context: {stats['context_tokens']}/{stats['budget_tokens']} tokens, {stats['passages']} passages "
+          f"({stats['duplicates_dropped']} duplicates, {stats['over_budget_dropped']} over budget dropped)")
+    return results
+
+def build_messages(question: str, results, history=()):
+    """Build the chat messages from the question, the retrieved passages and the session history."""
+    with span("prompt_build"):
+        return _build_messages(question, results, history)
+
+def _build_messages(question: str, results, history):
+    context = context_packer.join(results)
+    if context:
+        user_content = f"Question: {question}\n\nBook context:\n{context}"
+    else:
+        # Per-request instructions go in the user turn, never in the system prompt
+        user_content = f"Question: {question}\n\n{fallback_instruction()}"
+    # Static system prompt and history first, so consecutive turns share a cacheable prefix
+    messages = [
+        {"role": "system", "content": system_prompt()},
+        *history,
+        {"role": "user", "content": user_content}
+    ]
+    print(f"📏 Prompt tokens: {context_packer.count_messages(messages)}")
+    return messages
+
+def not_ready_body(question: str = ""):
+    """(body, headers) of the 503 sent while loading (with a retry hint) or after a required component failed."""
+    if startup.finished:
+        # Degraded: retrying will not help until the service is restarted
+        body = format_answers(question, "The coaching service is unavailable, a required component failed to load.", [])
+        body["startup"] = startup.status()
+        return body, {}
+    body = format_answers(question, "The coaching service is starting up, please retry in a few seconds.", [])
+    body["startup"] = startup.status()
+    return body, {"Retry-After": str(startup.retry_after)}
+
+# ---------- Startup ----------
+# Models and connections load in the background so the port binds immediately;
+# each server calls startup.start() once it has registered its own components
+startup = Startup(retry_after=STARTUP_RETRY_AFTER)
+startup.register("embedder", init_embedder)
+startup.register("retriever", init_retriever)
+startup.register("context_packer", init_context_packer)
+startup.register("language", language_identifier.warmup, required=False)
+
+# ---------- Metrics ----------
+registry.add_collector("embedding_cache", lambda: embedder.stats() if embedder else None)
+registry.add_collector("embedding_batcher", lambda: embedding_batcher.stats() if embedding_batcher else None)
+registry.add_collector("answer_cache", lambda: answer_cache.stats() if answer_cache else None)
+registry.add_collector("conversations", conversations.stats)
+registry.add_collector("language", language_identifier.stats)
+registry.add_collector("translation", translator.stats)
+registry.add_collector("ready", lambda: {"state": int(startup.ready)})
+
+# ---------- Pipeline ----------
+def answer_question(question: str, session_id=None):
+    """Answer one question (language, answer cache, retrieval, completion); returns the /ask body."""
+    history = conversations.history(session_id)
+    with span("language_detection"):
+        user_lang = detect_language(question)
+    print(f"Detected language: {user_lang}")
+    annotate(language=user_lang, answer_cache="miss", history_messages=len(history))
+
+    # Serve semantically equivalent questions from the answer cache
+    # (first turns only: a follow-up depends on the conversation)
+    question_emb = None
+    if answer_cache and retriever and not history:
+        with span("encode"):
+            question_emb = retriever.embedder.encode(question)
+        cached = answer_cache.lookup(question_emb, user_lang)
+        if cached:
+            print(f"⚡ Answer cache hit (similarity {cached['similarity']:.3f})")
+            annotate(answer_cache="hit")
+            conversations.record(session_id, question, cached["answer"])
+            return format_answers(question, cached["answer"], cached["results"])
+
+    # Retrieve context
+    try:
+        results = retrieve_context(question)
+    except Exception as e:
+        traceback.print_exc()
+        return format_answers(question, f"Retriever error: {e}", [])
+
+    # Query GPT
+    try:
+        messages = build_messages(question, results, history)
+        with span("completion"):
+            response = client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=700,
+            )
+        record_usage(response.usage)
+        answer = response.choices[0].message.content.strip()
+    except Exception as e:
+        traceback.print_exc()
+        return format_answers(question, f"⚠️ OpenAI call failed: {e}", [])
+
+    if question_emb is not None:
+        answer_cache.store(question_emb, user_lang, results, answer)
+    conversations.record(session_id, question, answer)
+    return format_answers(question, answer, results)
+
+def stream_answer(question: str, session_id=None):
+    """Streaming answer pipeline; yields (event, data) for `sources`, each `token` and `done`."""
+    history = conversations.history(session_id)
+    with span("language_detection"):
+        user_lang = detect_language(question)
+    print(f"Detected language: {user_lang}")
+    annotate(language=user_lang, answer_cache="miss", history_messages=len(history))
+
+    question_emb = None
+    if answer_cache and retriever and not history:
+        with span("encode"):
+            question_emb = retriever.embedder.encode(question)
+        cached = answer_cache.lookup(question_emb, user_lang)
+        if cached:
+            print(f"⚡ Answer cache hit (similarity {cached['similarity']:.3f})")
+            annotate(answer_cache="hit")
+            conversations.record(session_id, question, cached["answer"])
+            yield "sources", {"language": user_lang, "sources": cached["results"], "cached": True}
+            yield "token", {"text": cached["answer"]}
+            yield "done", format_answers(question, cached["answer"], cached["results"])
+            return
+
+    try:
+        results = retrieve_context(question)
+    except Exception as e:
+        traceback.print_exc()
+        yield "done", format_answers(question, f"Retriever error: {e}", [])
+        return
+
+    yield "sources", {
+        "language": user_lang,
+        "sources": [{"page": r.get("page"), "score": r.get("score", 0.0)} for r in results],
+        "cached": False
+    }
+
+    parts = []
+    try:
+        messages = build_messages(question, results, history)
+        with span("completion"):
+            stream = client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                max_tokens=700,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            started = time.perf_counter()
+            for chunk in stream:
+                if chunk.usage:
+                    record_usage(chunk.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not parts:
+                        annotate(first_token_ms=round((time.perf_counter() - started) * 1000, 2))
+                    parts.append(delta)
+                    yield "token", {"text": delta}
+    except Exception as e:
+        traceback.print_exc()
+        yield "done", format_answers(question, f"⚠️ OpenAI call failed: {e}", [])
+        return
+
+    answer = "".join(parts).strip()
+    if question_emb is not None:
+        answer_cache.store(question_emb, user_lang, results, answer)
+    conversations.record(session_id, question, answer)
+    yield "done", format_answers(question, answer, results)
+
+# ---------- Voice ----------
+audio_store = AudioStore(AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024, max_age=AUDIO_CACHE_TTL)
+registry.add_collector("audio_store", audio_store.stats)
+
+def transcribe(audio_bytes: bytes, filename: str) -> str:
+    """Whisper transcription straight from the uploaded bytes."""
+    with span("transcription"):
+        transcription = client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename or "audio.webm", audio_bytes)
+        )
+    return transcription.text.strip()
+
+def synthesize_speech(text: str):
+    """TTS for `text` as (store key, mp3 bytes); identical text is served from the audio store."""
+    key = AudioStore.key(TTS_MODEL, TTS_VOICE, text)
+    audio = audio_store.get(key)
+    if audio is None:
+        with span("speech"), client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
+            input=text,
+            response_format="mp3"
+        ) as speech:
+            audio = b"".join(speech.iter_bytes())
+        audio_store.put(key, audio)
+    return key, audio
+
@@ -3,40 +3,95 @@ from transformers import AutoTokenizer, AutoModelForQuestionAnswering
 import torch
 
 class BioBERTAnswerExtractor:
-    def __init__(self, model_name='dmis-lab/biobert-base-cased-v1.1-squad'):
+    """
+    Extractive QA over retrieved passages.
+
+    `extract_answers` runs one question against all passages in a single
+    padded forward pass. Long passages are split into overlapping windows
+    (`max_length` tokens, `stride` tokens of overlap) instead of being
+    truncated, and the best span is picked jointly over start + end logits,
+    limited to `max_answer_len` tokens inside the passage.
+    """
+
+    def __init__(self, model_name='dmis-lab/biobert-base-cased-v1.1-squad',
+                 num_threads=None, max_length=384, stride=128, max_answer_len=30, batch_size=16):
         print("⏳ Loading BioBERT model...")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)  # fast tokenizer: needed for offsets
         self.model = AutoModelForQuestionAnswering.from_pretrained(model_name)
-        print("BioBERT model loaded.")
+        self.model.eval()
+        self.max_length = max_length
+        self.stride = stride
+        self.max_answer_len = max_answer_len
+        self.batch_size = batch_size
+        print(f"BioBERT model loaded ({torch.get_num_threads()} threads).")
 
-    def extract_answer(self, question, context):
-        inputs = self.tokenizer.encode_plus(
-            question, context,
-            return_tensors='pt',
-            truncation=True,
-            max_length=512
-        )
+    def _best_span(self, start_logits, end_logits, context_mask):
+        """(score, start, end) of the best valid span in one window, or None."""
+        scores = start_logits[:, None] + end_logits[None, :]
+        length = scores.shape[0]
+        valid = torch.ones(length, length, dtype=torch.bool).triu().tril(self.max_answer_len - 1)
+        valid &= context_mask[:, None] & context_mask[None, :]
+        if not valid.any():
+            return None
+        scores = scores.masked_fill(~valid, float("-inf"))
+        best = int(torch.argmax(scores))
+        start, end = divmod(best, length)
+        return float(scores[start, end]), start, end
 
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            start_scores = outputs.start_logits
-            end_scores = outputs.end_logits
-
-        start_idx = torch.argmax(start_scores)
-        end_idx = torch.argmax(end_scores)
+    def extract_answers(self, question, contexts):
+        """
+        Best answer span for each context, in order:
+        [{"answer": str, "score": float}, ...] ("" when no valid span was found).
+        """
+        if not contexts:
+            return []
+        encoded = self.tokenizer(
+            [question] * len(contexts), list(contexts),
+            truncation="only_second",
+            max_length=self.max_length,
+            stride=self.stride,
+            return_overflowing_tokens=True,
+            return_offsets_mapping=True,
+            padding=True,
+            return_tensors="pt",
+        )
+        sample_map = encoded.pop("overflow_to_sample_mapping").tolist()
+        offsets = encoded.pop("offset_mapping").tolist()
 
-        if start_idx > end_idx:
-            return ""  # invalid span
+        start_logits, end_logits = [], []
+        with torch.inference_mode():
+            for i in range(0, len(sample_map), self.batch_size):
+                outputs = self.model(**{k: v[i:i + self.batch_size] for k, v in encoded.items()})
+                start_logits.append(outputs.start_logits)
+                end_logits.append(outputs.end_logits)
+        start_logits = torch.cat(start_logits)
+        end_logits = torch.cat(end_logits)
 
-        all_tokens = self.tokenizer.convert_ids_to_tokens(inputs['input_ids'][0])
-        answer_tokens = all_tokens[start_idx:end_idx + 1]
-        answer = self.tokenizer.convert_tokens_to_string(answer_tokens).strip()
+        best = [None] * len(contexts)
+        for window, sample in enumerate(sample_map):
+            context_mask = torch.tensor([s == 1 for s in encoded.sequence_ids(window)])
+            span = self._best_span(start_logits[window], end_logits[window], context_mask)
+            if span and (best[sample] is None or span[0] > best[sample][0]):
+                score, start, end = span
+                best[sample] = (score, offsets[window][start][0], offsets[window][end][1])
 
-        # Filter out junk answers
-        if not answer or answer.lower() in ["[cls]", "[sep]"] or len(answer) < 3:
-            return ""  # signal to use fallback
+        answers = []
+        for context, span in zip(contexts, best):
+            if span is None:
+                answers.append({"answer": "", "score": float("-inf")})
+                continue
+            score, char_start, char_end = span
+            answer = context[char_start:char_end].strip()
+            # Filter out junk answers
+            if len(answer) < 3:
+                answer = ""  # signal to use fallback
+            answers.append({"answer": answer, "score": score})
+        return answers
 
-        return answer
+    def extract_answer(self, question, context):
+        return self.extract_answers(question, [context])[0]["answer"]
 
 
 # Example usage
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+
+class EmbeddingQueueFull(RuntimeError):
+    """Raised when the embedding queue stays full longer than the submit timeout."""
+
+
+class BatchingEmbedder:
+    """
+    Micro-batching scheduler in front of `SentenceTransformer.encode`.
+
+    Concurrent callers enqueue single texts; a background worker collects
+    requests for up to `window_ms` or `max_batch_size` items and runs them
+    through one batched `encode` call, handing each caller its own vector
+    through a future. The queue is bounded, so bursts beyond `max_queue`
+    pending texts fail fast with EmbeddingQueueFull instead of piling up.
+    """
+
+    def __init__(self, model, max_batch_size=32, window_ms=5.0, max_queue=256, submit_timeout=1.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000.0
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.batch_sizes = {}
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def submit(self, text: str, normalize_embeddings: bool = False) -> Future:
+        future = Future()
+        try:
+            self._queue.put((text, normalize_embeddings, future, time.perf_counter()),
+                            timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise EmbeddingQueueFull("Embedding queue is full, try again later.")
+        return future
+
+    def encode(self, sentences, normalize_embeddings: bool = False, **kwargs):
+        """Same contract as SentenceTransformer.encode for str or list[str] input."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        # Bulk jobs (index builds) are already batched, send them straight through
+        if len(texts) > self.max_batch_size:
+            kwargs.pop("convert_to_numpy", None)
+            return self.model.encode(texts, convert_to_numpy=True,
+                                     normalize_embeddings=normalize_embeddings, **kwargs)
+
+        futures = [self.submit(t, normalize_embeddings) for t in texts]
+        vectors = [f.result() for f in futures]
+        if single:
+            return vectors[0]
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(batch, started)
+
+            # normalize_embeddings changes the output, so encode each flavour separately
+            for flag in {item[1] for item in batch}:
+                group = [item for item in batch if item[1] == flag]
+                try:
+                    vectors = self.model.encode([item[0] for item in group], convert_to_numpy=True,
+                                                normalize_embeddings=flag)
+                except Exception as e:
+                    for item in group:
+                        item[2].set_exception(e)
+                    continue
+                for item, vec in zip(group, vectors):
+                    item[2].set_result(vec)
+
+    def _record(self, batch, started):
+        waits = [started - item[3] for item in batch]
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            self.queue_wait_total += sum(waits)
+            self.queue_wait_max = max(self.queue_wait_max, max(waits))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "rejected": self.rejected,
+                "queue_depth": self._queue.qsize(),
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "mean_queue_ms": 1000 * self.queue_wait_total / self.items if self.items else 0.0,
+                "max_queue_ms": 1000 * self.queue_wait_max,
+            }
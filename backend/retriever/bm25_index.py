@@ -0,0 +1,120 @@
+import json
+import re
+import numpy as np
+from scipy import sparse
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    return TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a precomputed sparse term-document matrix.
+
+    Every (document, term) BM25 contribution is computed once at build time
+    and stored as a CSR matrix, so scoring a query is one sparse mat-vec and
+    a batch of queries is one sparse mat-mat. Scores match rank_bm25.BM25Okapi
+    (same IDF with epsilon floor for very common terms).
+    """
+
+    def __init__(self, weights, vocab, k1=1.5, b=0.75, epsilon=0.25):
+        self.weights = weights.tocsr()
+        self.vocab = vocab
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+    @property
+    def n_docs(self):
+        """Number of indexed documents (rows of the stored matrix)."""
+        return self.weights.shape[0]
+
+    @classmethod
+    def build(cls, corpus, k1=1.5, b=0.75, epsilon=0.25):
+        """Build from an iterable of raw document strings."""
+        vocab, rows, cols, counts = {}, [], [], []
+        doc_lens = []
+        for doc_id, text in enumerate(corpus):
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            tf = {}
+            for tok in tokens:
+                term_id = vocab.setdefault(tok, len(vocab))
+                tf[term_id] = tf.get(term_id, 0) + 1
+            rows.extend([doc_id] * len(tf))
+            cols.extend(tf.keys())
+            counts.extend(tf.values())
+
+        n_docs = len(doc_lens)
+        tf = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(n_docs, len(vocab)),
+        )
+        doc_lens = np.asarray(doc_lens, dtype=np.float32)
+        avgdl = doc_lens.mean() if n_docs else 0.0
+
+        # IDF as in rank_bm25: negative values are floored at epsilon * mean idf
+        df = np.bincount(tf.indices, minlength=len(vocab)).astype(np.float64)
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+
+        # tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)), applied per nonzero
+        norm = k1 * (1 - b + b * doc_lens / (avgdl or 1.0))
+        row_norm = np.repeat(norm, np.diff(tf.indptr))
+        data = tf.data * (k1 + 1) / (tf.data + row_norm)
+        data *= idf[tf.indices].astype(np.float32)
+
+        weights = sparse.csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+        return cls(weights, vocab, k1, b, epsilon)
+
+    def _query_matrix(self, queries):
+        """Sparse (terms x queries) matrix of query term counts."""
+        rows, cols = [], []
+        for q_id, query in enumerate(queries):
+            for tok in tokenize(query):
+                term_id = self.vocab.get(tok)
+                if term_id is not None:
+                    rows.append(term_id)
+                    cols.append(q_id)
+        data = np.ones(len(rows), dtype=np.float32)
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(self.vocab), len(queries)))
+
+    def get_scores(self, query: str):
+        return self.get_batch_scores([query])[0]
+
+    def get_batch_scores(self, queries):
+        """Dense (queries x documents) score matrix."""
+        return np.asarray((self.weights @ self._query_matrix(queries)).T.todense())
+
+    @staticmethod
+    def top_k(scores, k):
+        """Indices of the k best scores, best first, without a full sort."""
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def save(self, path):
+        """Serialize to a single .npz (matrix + vocabulary + parameters)."""
+        np.savez(
+            path,
+            data=self.weights.data,
+            indices=self.weights.indices,
+            indptr=self.weights.indptr,
+            shape=np.asarray(self.weights.shape),
+            vocab=np.frombuffer(json.dumps(self.vocab).encode("utf-8"), dtype=np.uint8),
+            params=np.asarray([self.k1, self.b, self.epsilon]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            weights = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            vocab = json.loads(f["vocab"].tobytes().decode("utf-8"))
+            k1, b, epsilon = f["params"].tolist()
+        return cls(weights, vocab, k1, b, epsilon)
@@ -1,42 +1,58 @@
-
-import json
-from rank_bm25 import BM25Okapi
-import nltk
-from nltk.tokenize import word_tokenize
-
-nltk.download('punkt')
+import os
+import time
+from retriever.bm25_index import BM25Index
+from retriever.corpus import load_corpus, iter_field, corpus_mtime
 
 class BM25Retriever:
-    def __init__(self, json_path):
+    def __init__(self, json_path, index_path=None):
         self.data = self.load_data(json_path)
-        self.contexts = [item["context"] for item in self.data]
-        self.tokenized_corpus = [word_tokenize(doc.lower()) for doc in self.contexts]
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+
+        # Reuse the serialized index snapshot unless the corpus changed since it was built.
+        # The name keeps the corpus extension, so .json, .jsonl and .cols copies of one
+        # dataset get separate snapshots; a document count mismatch also forces a rebuild.
+        self.index_path = index_path or json_path.rstrip("/") + ".bm25.npz"
+        start = time.perf_counter()
+        self.bm25 = None
+        if os.path.exists(self.index_path) and os.path.getmtime(self.index_path) >= corpus_mtime(json_path):
+            snapshot = BM25Index.load(self.index_path)
+            if snapshot.n_docs == len(self.data):
+                self.bm25 = snapshot
+                print(f"✅ BM25 snapshot loaded in {time.perf_counter() - start:.2f}s")
+            else:
+                print(f"⚠️ BM25 snapshot has {snapshot.n_docs} documents, corpus has {len(self.data)}; rebuilding")
+        if self.bm25 is None:
+            self.bm25 = BM25Index.build(iter_field(self.data, "context"))
+            self.bm25.save(self.index_path)
+            print(f"✅ BM25 index built in {time.perf_counter() - start:.2f}s, snapshot saved to {self.index_path}")
 
     def load_data(self, path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """.json, .jsonl or a memory-mapped columnar directory (see retriever/corpus.py)."""
+        return load_corpus(path)
 
-    def retrieve(self, query, top_k=5):
-        tokenized_query = word_tokenize(query.lower())
-        scores = self.bm25.get_scores(tokenized_query)
-        top_k_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
+    def _results(self, scores, top_k):
         results = []
-
-        for i in top_k_indices:
+        for i in BM25Index.top_k(scores, top_k):
             item = self.data[i]
             results.append({
-                "score": scores[i],
+                "score": float(scores[i]),
                 "title": item["title"],
                 "context": item["context"],
                 "source": item.get("source", "")
             })
-
         return results
 
+    def retrieve(self, query, top_k=5):
+        return self._results(self.bm25.get_scores(query), top_k)
+
+    def retrieve_batch(self, queries, top_k=5):
+        """Score many queries with one sparse matrix product."""
+        scores = self.bm25.get_batch_scores(queries)
+        return [self._results(row, top_k) for row in scores]
+
 # Example usage:
 if __name__ == "__main__":
-    retriever = BM25Retriever("data/medquad_cleaned.json")
+    from retriever.corpus import MEDQUAD_PATHS, first_existing
+    retriever = BM25Retriever(first_existing(MEDQUAD_PATHS))
     question = input("Ask a medical question: ")
     results = retriever.retrieve(question)
 
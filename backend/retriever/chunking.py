@@ -0,0 +1,124 @@
+import json
+import os
+import re
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+|\s*•\s*")
+
+
+def _is_doubled(token: str) -> bool:
+    """True for OCR artifacts where every character is printed twice ('JJAAVVIIDD')."""
+    if len(token) < 2 or len(token) % 2 or any(c.isdigit() for c in token):
+        return False
+    return all(token[i] == token[i + 1] for i in range(0, len(token), 2))
+
+
+def clean_ocr(text: str) -> str:
+    """
+    Remove the doubled-character OCR noise of the book scan.
+    'CCooaacchhiinngg' becomes 'Coaching'; stray margin letters such as
+    'NN' or '&&' are dropped.
+    """
+    lines = []
+    for line in text.splitlines():
+        words = []
+        for token in line.split():
+            if _is_doubled(token):
+                if len(token) == 2:
+                    continue  # margin letter, e.g. 'NN'
+                token = token[::2]
+            words.append(token)
+        if words:
+            lines.append(" ".join(words))
+    return "\n".join(lines)
+
+
+def split_sentences(text: str):
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+
+class Chunker:
+    """
+    Sentence-aware splitter that packs sentences into overlapping chunks of at
+    most `max_tokens` tokens, counted with the embedding model's tokenizer.
+    """
+
+    def __init__(self, tokenizer, max_tokens=256, overlap_tokens=32):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def _pieces(self, text):
+        """Sentences with token counts; overlong sentences are split on whitespace."""
+        for sentence in split_sentences(text):
+            n = self.count(sentence)
+            if n <= self.max_tokens:
+                yield sentence, n
+                continue
+            part, part_n = [], 0
+            for word in sentence.split():
+                word_n = self.count(word)
+                if part and part_n + word_n > self.max_tokens:
+                    yield " ".join(part), part_n
+                    part, part_n = [], 0
+                part.append(word)
+                part_n += word_n
+            if part:
+                yield " ".join(part), part_n
+
+    def split(self, text: str):
+        chunks, current, current_n = [], [], 0
+        for piece, n in self._pieces(text):
+            if current and current_n + n > self.max_tokens:
+                chunks.append(" ".join(p for p, _ in current))
+                # Carry trailing sentences into the next chunk as overlap
+                overlap, overlap_n = [], 0
+                for p, pn in reversed(current):
+                    if overlap_n + pn > self.overlap_tokens or overlap_n + pn + n > self.max_tokens:
+                        break
+                    overlap.insert(0, (p, pn))
+                    overlap_n += pn
+                current, current_n = overlap, overlap_n
+            current.append((piece, n))
+            current_n += n
+        if current:
+            chunks.append(" ".join(p for p, _ in current))
+        return chunks
+
+    def chunk_documents(self, documents):
+        """Split [{"id", "page", "context"}] pages into chunk documents with page metadata."""
+        chunks = []
+        for doc in documents:
+            for n, text in enumerate(self.split(clean_ocr(doc["context"]))):
+                chunks.append({
+                    "id": f"{doc['id']}-{n}",
+                    "page": doc.get("page"),
+                    "chunk": n,
+                    "context": text,
+                })
+        return chunks
+
+
+def load_chunker(model_path, max_tokens=None, overlap_tokens=32):
+    """
+    Chunker with the tokenizer and window of a saved SentenceTransformer,
+    matching the defaults of build_index.py.
+    """
+    from transformers import AutoTokenizer
+    if max_tokens is None:
+        with open(os.path.join(model_path, "sentence_bert_config.json"), "r", encoding="utf-8") as f:
+            # The window counts [CLS] and [SEP], chunks must leave room for them
+            max_tokens = json.load(f)["max_seq_length"] - 2
+    return Chunker(AutoTokenizer.from_pretrained(model_path), max_tokens, overlap_tokens)
+
+
+def unique_pages(results):
+    """Pages of the results in rank order, each cited once."""
+    pages = []
+    for r in results:
+        page = r.get("page")
+        if page and page not in pages:
+            pages.append(page)
+    return pages
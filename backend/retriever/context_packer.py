@@ -0,0 +1,100 @@
+import re
+import tiktoken
+
+WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 5):
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ApproximateEncoding:
+    """Stand-in when the BPE file cannot be loaded (offline host): about 4 characters per token."""
+
+    name = "approx-chars/4"
+
+    def encode(self, text: str):
+        return range((len(text) + 3) // 4)
+
+
+def load_encoding(model: str):
+    """The model's tiktoken encoding, or ApproximateEncoding when it cannot be downloaded."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The BPE file is fetched on first use; a network or SSL error must not fail startup
+        print(f"⚠️ tiktoken encoding for {model} unavailable ({e}); counting ~4 characters per token.")
+        return ApproximateEncoding()
+
+
+def format_passage(result) -> str:
+    return f"(Seite {result['page']}) {result['context']}"
+
+
+class ContextPacker:
+    """
+    Token-budgeted context assembly for the /ask prompt.
+
+    Passages are taken greedily by score while they fit `budget_tokens`
+    (counted with the chat model's tokenizer), skipping near-duplicates whose
+    word-shingle Jaccard similarity with an already packed passage is at least
+    `duplicate_threshold`. Overlapping chunks of the same page are the usual case.
+    """
+
+    SEPARATOR = "\n\n---\n\n"
+
+    def __init__(self, model="gpt-4o-mini", budget_tokens=1500, duplicate_threshold=0.6):
+        self.encoding = load_encoding(model)
+        self.budget_tokens = budget_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.separator_tokens = self.count(self.SEPARATOR)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def count_messages(self, messages) -> int:
+        # ~4 tokens of chat framing per message plus 2 for the reply primer
+        return sum(self.count(m["content"]) + 4 for m in messages) + 2
+
+    def pack(self, results):
+        """Return (packed results in score order, stats)."""
+        packed, packed_shingles = [], []
+        used, duplicates, over_budget = 0, 0, 0
+
+        for r in sorted(results, key=lambda x: x.get("score", 0), reverse=True):
+            sh = shingles(r.get("context", ""))
+            if any(jaccard(sh, other) >= self.duplicate_threshold for other in packed_shingles):
+                duplicates += 1
+                continue
+
+            cost = self.count(format_passage(r)) + (self.separator_tokens if packed else 0)
+            if used + cost > self.budget_tokens:
+                over_budget += 1
+                continue
+
+            packed.append(r)
+            packed_shingles.append(sh)
+            used += cost
+
+        return packed, {
+            "context_tokens": used,
+            "budget_tokens": self.budget_tokens,
+            "passages": len(packed),
+            "duplicates_dropped": duplicates,
+            "over_budget_dropped": over_budget,
+        }
+
+    def join(self, results) -> str:
+        return self.SEPARATOR.join(format_passage(r) for r in results)
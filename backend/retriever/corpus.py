@@ -0,0 +1,173 @@
+"""
+Readers and writers for passage corpora ({"title", "context", "source"} records).
+
+Three on-disk formats are supported:
+  .json      one JSON array (legacy; parsed whole)
+  .jsonl     one record per line; opened as a memory-mapped sequence indexed
+             by line offsets, so only the accessed records are parsed
+  .cols/     columnar directory: per field a UTF-8 blob (<field>.bin) plus
+             int64 offsets (<field>.idx.npy). Both are memory-mapped, so
+             opening is O(1) and a record is only decoded when accessed.
+"""
+import json
+import os
+import numpy as np
+
+COLUMNAR_SUFFIX = ".cols"
+
+
+# ---------- JSON Lines ----------
+def iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class JsonlCorpus:
+    """Read-only sequence over a .jsonl file: byte offsets per record, lines parsed on access."""
+
+    def __init__(self, path):
+        self.path = path
+        starts, ends = [], []
+        with open(path, "rb") as f:
+            pos = 0
+            for line in f:
+                if line.strip():
+                    starts.append(pos)
+                    ends.append(pos + len(line))
+                pos += len(line)
+        self._starts = np.asarray(starts, dtype=np.int64)
+        self._ends = np.asarray(ends, dtype=np.int64)
+        # np.memmap cannot map an empty file
+        self._blob = np.memmap(path, dtype=np.uint8, mode="r") if pos else b""
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return json.loads(bytes(self._blob[self._starts[i]:self._ends[i]]).decode("utf-8"))
+
+    def __iter__(self):
+        return iter_jsonl(self.path)
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, records):
+        self._f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+
+    def close(self):
+        self._f.close()
+
+
+# ---------- Columnar ----------
+class ColumnarCorpus:
+    """Read-only, memory-mapped sequence of records stored by ColumnarWriter."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.path = path
+        self.fields = meta["fields"]
+        self._offsets = {}
+        self._blobs = {}
+        for field in self.fields:
+            self._offsets[field] = np.load(os.path.join(path, f"{field}.idx.npy"), mmap_mode="r")
+            blob = os.path.join(path, f"{field}.bin")
+            # np.memmap cannot map an empty file
+            self._blobs[field] = np.memmap(blob, dtype=np.uint8, mode="r") if os.path.getsize(blob) else b""
+        self._len = meta["count"]
+
+    def __len__(self):
+        return self._len
+
+    def value(self, i, field):
+        offsets = self._offsets[field]
+        return bytes(self._blobs[field][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return {field: self.value(i, field) for field in self.fields}
+
+    def __iter__(self):
+        return (self[i] for i in range(self._len))
+
+    def column(self, field):
+        """Lazily yield one field of every record (e.g. the texts to index)."""
+        return (self.value(i, field) for i in range(self._len))
+
+
+class ColumnarWriter:
+    """Appends records chunk by chunk; only the offsets are kept in memory."""
+
+    def __init__(self, path, fields=("title", "context", "source")):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fields = list(fields)
+        self._blobs = {f: open(os.path.join(path, f"{f}.bin"), "wb") for f in self.fields}
+        self._offsets = {f: [np.zeros(1, dtype=np.int64)] for f in self.fields}
+        self._ends = {f: 0 for f in self.fields}
+        self.count = 0
+
+    def write(self, records):
+        records = list(records)
+        for field in self.fields:
+            encoded = [str(r.get(field, "")).encode("utf-8") for r in records]
+            self._blobs[field].write(b"".join(encoded))
+            ends = self._ends[field] + np.cumsum([len(e) for e in encoded], dtype=np.int64)
+            if len(ends):
+                self._offsets[field].append(ends)
+                self._ends[field] = int(ends[-1])
+        self.count += len(records)
+
+    def close(self):
+        for field in self.fields:
+            self._blobs[field].close()
+            np.save(os.path.join(self.path, f"{field}.idx.npy"), np.concatenate(self._offsets[field]))
+        # Written last: a directory without meta.json is an incomplete write
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"fields": self.fields, "count": self.count}, f)
+
+
+# ---------- Dispatch ----------
+# Cleaner output before and after the switch to JSON Lines
+MEDQUAD_PATHS = ("data/medquad_cleaned.jsonl", "data/medquad_cleaned.json")
+
+
+def first_existing(paths):
+    """First of `paths` that exists; the first one when none does, so the error names it."""
+    return next((p for p in paths if os.path.exists(p)), paths[0])
+
+
+def load_corpus(path):
+    """A sequence of records; memory-mapped for columnar and JSON Lines corpora."""
+    if os.path.isdir(path) or path.endswith(COLUMNAR_SUFFIX):
+        return ColumnarCorpus(path)
+    if path.endswith(".jsonl"):
+        return JsonlCorpus(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_field(corpus, field):
+    """One field of every record without materializing the whole list."""
+    if isinstance(corpus, ColumnarCorpus):
+        return corpus.column(field)
+    return (item[field] for item in corpus)
+
+
+def corpus_mtime(path):
+    """Last modification of the corpus (for columnar corpora: of its meta.json)."""
+    if os.path.isdir(path):
+        return os.path.getmtime(os.path.join(path, "meta.json"))
+    return os.path.getmtime(path)
@@ -0,0 +1,257 @@
+"""
+Retrieval quality + speed evaluation over the coaching dataset.
+
+Runs every retriever configuration against a labeled query set (question →
+expected book pages, German and English) and reports recall@k, hit@k, MRR and
+nDCG@k on page level, per-query latency and the memory the retriever added to
+the process. With --min-recall / --min-mrr the fastest configuration meeting
+the quality bar is recommended.
+
+The labeled set lives in data/eval_queries.json; --synthetic N adds N queries
+made from sentences of random pages (each labeled with its own page).
+
+Usage:
+    python -m retriever.evaluate --configs bm25 local hybrid-rrf faiss-flat --out data/eval_report.json
+    python -m retriever.evaluate --configs local pinecone --synthetic 100 --min-recall 0.5
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from retriever.bm25_index import BM25Index
+from retriever.chunking import clean_ocr, split_sentences
+from retriever.local_retriever import load_documents
+
+DATA_PATH = "data/coaching_millionaer_dataset.json"
+QUERIES_PATH = "data/eval_queries.json"
+LOCAL_INDEX_DIR = "data/local_index"
+LOCAL_MODEL_PATH = "./model"
+CONFIGS = ["bm25", "local", "hybrid-rrf", "hybrid-weighted",
+           "faiss-flat", "faiss-hnsw", "faiss-ivf", "faiss-ivfpq", "pinecone"]
+
+
+# ---------- Query set ----------
+def load_queries(path=QUERIES_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def synthetic_queries(data_path, n, seed=0, min_words=8, max_words=30):
+    """Sentences sampled from content pages, each labeled with its own page."""
+    rng = random.Random(seed)
+    candidates = []
+    for doc in load_documents(data_path):
+        for sentence in split_sentences(clean_ocr(doc["context"])):
+            if min_words <= len(sentence.split()) <= max_words:
+                candidates.append((doc["page"], sentence))
+    return [
+        {"id": f"synthetic-{i}", "lang": "de", "question": sentence, "pages": [page]}
+        for i, (page, sentence) in enumerate(rng.sample(candidates, min(n, len(candidates))))
+    ]
+
+
+# ---------- Metrics ----------
+def ranked_pages(results):
+    """Distinct pages in rank order (chunked indexes return several hits per page)."""
+    pages, seen = [], set()
+    for r in results:
+        page = str(r.get("page"))
+        if page not in seen:
+            seen.add(page)
+            pages.append(page)
+    return pages
+
+
+def score_query(pages, relevant, k):
+    relevant = {str(p) for p in relevant}
+    top = pages[:k]
+    hits = [p in relevant for p in top]
+    first = next((i for i, p in enumerate(pages) if p in relevant), None)
+    dcg = sum(1 / math.log2(i + 2) for i, hit in enumerate(hits) if hit)
+    idcg = sum(1 / math.log2(i + 2) for i in range(min(len(relevant), k)))
+    return {
+        f"recall@{k}": sum(hits) / len(relevant),
+        f"hit@{k}": float(any(hits)),
+        "mrr": 1 / (first + 1) if first is not None else 0.0,
+        f"ndcg@{k}": dcg / idcg if idcg else 0.0,
+    }
+
+
+def mean(rows, key):
+    return sum(r[key] for r in rows) / len(rows) if rows else 0.0
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def rss_mb():
+    """Resident set size of this process (Linux); 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+# ---------- Retriever configurations ----------
+class BM25PageRetriever:
+    """BM25 over the book pages (BM25Retriever expects the MedQuAD schema)."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.bm25 = BM25Index.build(clean_ocr(d["context"]) for d in documents)
+
+    def retrieve(self, query, top_k=10):
+        scores = self.bm25.get_scores(query)
+        return [{"context": self.documents[i]["context"], "page": self.documents[i]["page"], "score": float(scores[i])}
+                for i in BM25Index.top_k(scores, top_k)]
+
+
+class PineconeQueryRetriever:
+    """The app's Pinecone path: bundled query embedder + index.query."""
+
+    def __init__(self, embedder, index):
+        self.embedder = embedder
+        self.index = index
+
+    def retrieve(self, query, top_k=10):
+        res = self.index.query(vector=self.embedder.encode(query).tolist(), top_k=top_k, include_metadata=True)
+        return [{"id": m.get("id"), "context": m.get("metadata", {}).get("context", ""), "page": m.get("metadata", {}).get("page"),
+                 "score": m.get("score", 0)} for m in res.get("matches", [])]
+
+
+def create_retriever(name, data_path, embedder_factory):
+    if name == "bm25":
+        return BM25PageRetriever(load_documents(data_path))
+    if name == "local" or name.startswith("hybrid-"):
+        from retriever.local_retriever import LocalRetriever
+        dense = LocalRetriever(embedder_factory(), LOCAL_INDEX_DIR)
+        if name == "local":
+            return dense
+        from retriever.hybrid_retriever import HybridRetriever
+        with open(os.path.join(LOCAL_INDEX_DIR, "metadata.json"), "r", encoding="utf-8") as f:
+            documents = json.load(f)
+        return HybridRetriever(dense, documents, fusion=name.split("-", 1)[1])
+    if name.startswith("faiss-"):
+        from retriever.faiss_retriever import FAISSRetriever
+        return FAISSRetriever(data_path, index_type=name.split("-", 1)[1])
+    if name == "pinecone":
+        from clients import USE_FAKE_CLIENTS, create_pinecone_index
+        if not (USE_FAKE_CLIENTS or os.getenv("PINECONE_API_KEY")):
+            raise ValueError("PINECONE_API_KEY not set")
+        index = create_pinecone_index(os.getenv("PINECONE_API_KEY"), os.getenv("PINECONE_INDEX_NAME", "ebook"))
+        return PineconeQueryRetriever(embedder_factory(), index)
+    raise ValueError(f"Unknown configuration '{name}'")
+
+
+# ---------- Evaluation ----------
+def evaluate(name, retriever, queries, k=10, memory_mb=0.0, build_s=0.0, overfetch=4):
+    """
+    Page-level metrics at k. Chunked indexes return several passages per page,
+    so `k * overfetch` passages are retrieved and cut to the first k distinct pages.
+    """
+    top_k = k * overfetch
+    retriever.retrieve(queries[0]["question"], top_k=top_k)  # warmup
+    rows, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results = retriever.retrieve(q["question"], top_k=top_k)
+        latency = (time.perf_counter() - start) * 1000
+        latencies.append(latency)
+        pages = ranked_pages(results)[:k]
+        rows.append({"id": q["id"], "lang": q["lang"], "latency_ms": round(latency, 2),
+                     "passages": len(results), "pages": pages, **score_query(pages, q["pages"], k)})
+
+    metrics = [f"recall@{k}", f"hit@{k}", "mrr", f"ndcg@{k}"]
+    summary = {m: round(mean(rows, m), 4) for m in metrics}
+    return {
+        "config": name,
+        **summary,
+        "by_lang": {
+            lang: {m: round(mean([r for r in rows if r["lang"] == lang], m), 4) for m in metrics}
+            for lang in sorted({r["lang"] for r in rows})
+        },
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2),
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+        },
+        "passages_retrieved": top_k,
+        "pages_mean": round(sum(len(r["pages"]) for r in rows) / len(rows), 2),
+        "index_memory_mb": round(memory_mb, 1),
+        "build_s": round(build_s, 2),
+        "queries": rows,
+    }
+
+
+def recommend(reports, k, min_recall=0.0, min_mrr=0.0):
+    """Fastest (p50) configuration meeting the quality bar, or None."""
+    passing = [r for r in reports if r[f"recall@{k}"] >= min_recall and r["mrr"] >= min_mrr]
+    return min(passing, key=lambda r: r["latency_ms"]["p50"])["config"] if passing else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate retriever quality and speed on labeled queries.")
+    parser.add_argument("--configs", nargs="+", default=["bm25", "local", "hybrid-rrf", "faiss-flat", "pinecone"],
+                        choices=CONFIGS)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--synthetic", type=int, default=0, help="Add N sentence queries sampled from pages")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--overfetch", type=int, default=4, help="Retrieve k * N passages to fill k distinct pages")
+    parser.add_argument("--min-recall", type=float, default=0.0)
+    parser.add_argument("--min-mrr", type=float, default=0.0)
+    parser.add_argument("--out", default="data/eval_report.json", help="JSON report path")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    if args.synthetic:
+        queries += synthetic_queries(args.data, args.synthetic)
+
+    shared = {}
+
+    def embedder_factory():
+        # Loaded once outside the per-retriever memory measurement
+        if "embedder" not in shared:
+            from sentence_transformers import SentenceTransformer
+            from cache.embedding_cache import CachedEmbedder
+            shared["embedder"] = CachedEmbedder(SentenceTransformer(LOCAL_MODEL_PATH), LOCAL_MODEL_PATH)
+        return shared["embedder"]
+
+    if any(c in ("local", "pinecone") or c.startswith("hybrid-") for c in args.configs):
+        embedder_factory()
+
+    reports = []
+    for name in args.configs:
+        before, start = rss_mb(), time.perf_counter()
+        try:
+            retriever = create_retriever(name, args.data, embedder_factory)
+        except Exception as e:
+            print(f"⚠️ Skipping {name}: {e}")
+            continue
+        build_s = time.perf_counter() - start
+        reports.append(evaluate(name, retriever, queries, args.k, rss_mb() - before, build_s, args.overfetch))
+
+    k = args.k
+    print(f"\n{len(queries)} queries, k={k}")
+    print(f"{'config':<16}{'recall@' + str(k):>10}{'hit@' + str(k):>8}{'MRR':>8}{'nDCG@' + str(k):>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'MB':>8}")
+    for r in reports:
+        print(f"{r['config']:<16}{r[f'recall@{k}']:>10.3f}{r[f'hit@{k}']:>8.3f}{r['mrr']:>8.3f}"
+              f"{r[f'ndcg@{k}']:>9.3f}{r['latency_ms']['p50']:>9.2f}{r['latency_ms']['p95']:>9.2f}"
+              f"{r['index_memory_mb']:>8.1f}")
+
+    best = recommend(reports, k, args.min_recall, args.min_mrr)
+    print(f"\n🏁 Fastest configuration meeting the bar: {best or 'none'}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"k": k, "queries": len(queries), "min_recall": args.min_recall, "min_mrr": args.min_mrr,
+                   "recommended": best, "results": reports}, f, ensure_ascii=False, indent=2)
+    print(f"✅ Report written to {args.out}")
@@ -0,0 +1,83 @@
+"""
+Recall / speed / memory benchmark for the FAISS index types of FAISSRetriever.
+
+Every index type is built over the same embeddings and compared against the
+exact flat index: recall@k, queries per second, build time and serialized size.
+
+Usage:
+    python -m retriever.faiss_benchmark
+    python -m retriever.faiss_benchmark --data data/medquad_cleaned.jsonl --field context --types flat hnsw ivfpq
+"""
+import argparse
+import json
+import time
+import numpy as np
+import faiss
+from sentence_transformers import SentenceTransformer
+from sklearn.preprocessing import normalize
+from retriever.corpus import load_corpus, iter_field
+from retriever.faiss_retriever import INDEX_DEFAULTS, create_index
+
+
+def recall_at_k(truth, found, k):
+    hits = sum(len(set(t[:k]) & set(f[:k])) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def benchmark(embeddings, queries, index_types, k=10, params=None):
+    params = params or {}
+    flat, _ = create_index("flat", embeddings)
+    _, truth = flat.search(queries, k)
+
+    report = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index, effective = create_index(index_type, embeddings, params.get(index_type))
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        search_s = time.perf_counter() - start
+
+        report.append({
+            "index_type": index_type,
+            "params": effective,
+            f"recall@{k}": recall_at_k(truth, found, k),
+            "qps": len(queries) / search_s if search_s else float("inf"),
+            "build_s": build_s,
+            "memory_mb": faiss.serialize_index(index).nbytes / 1e6,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types against the flat baseline.")
+    parser.add_argument("--data", default="data/coaching_millionaer_dataset.json")
+    parser.add_argument("--field", default="text", help="Text field of the dataset entries")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
+    parser.add_argument("--types", nargs="+", default=list(INDEX_DEFAULTS))
+    parser.add_argument("--queries", type=int, default=200, help="Passages reused as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    texts = list(iter_field(load_corpus(args.data), args.field))
+
+    model = SentenceTransformer(args.model)
+    embeddings = normalize(model.encode(texts, convert_to_numpy=True, show_progress_bar=True)).astype(np.float32)
+
+    # Slightly perturbed passages stand in for queries near the corpus
+    rng = np.random.default_rng(0)
+    sample = embeddings[rng.choice(len(embeddings), min(args.queries, len(embeddings)), replace=False)]
+    queries = normalize(sample + rng.normal(0, 0.05, sample.shape)).astype(np.float32)
+
+    report = benchmark(embeddings, queries, args.types, args.k)
+    print(f"\n{len(texts)} passages, dim {embeddings.shape[1]}, {len(queries)} queries")
+    print(f"{'index':<8}{'recall@' + str(args.k):>12}{'QPS':>12}{'build s':>10}{'MB':>10}")
+    for row in report:
+        print(f"{row['index_type']:<8}{row[f'recall@{args.k}']:>12.3f}{row['qps']:>12.0f}"
+              f"{row['build_s']:>10.2f}{row['memory_mb']:>10.2f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
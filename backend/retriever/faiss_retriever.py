@@ -1,36 +1,113 @@
 import json
+import math
 import os
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer, CrossEncoder
 from sklearn.preprocessing import normalize
+from cache.embedding_cache import CachedEmbedder
+from retriever.reranker import AdaptiveReranker
+
+# Defaults per index type; anything here can be overridden through index_params
+INDEX_DEFAULTS = {
+    "flat": {},
+    "hnsw": {"M": 32, "efConstruction": 200, "efSearch": 64},
+    "ivf": {"nlist": 256, "nprobe": 16},
+    "ivfpq": {"nlist": 256, "nprobe": 16, "m": 48, "nbits": 8},
+}
+
+
+def create_index(index_type, embeddings, params=None):
+    """
+    Build an inner-product FAISS index of the given type over normalized embeddings.
+    IVF list counts and PQ code sizes are clamped to what the corpus can train.
+    Returns (index, effective params).
+    """
+    if index_type not in INDEX_DEFAULTS:
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {list(INDEX_DEFAULTS)}")
+    params = {**INDEX_DEFAULTS[index_type], **(params or {})}
+    n, dim = embeddings.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["M"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["efConstruction"]
+    else:
+        # FAISS wants ~39 training points per inverted list
+        params["nlist"] = max(1, min(params["nlist"], n // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"], faiss.METRIC_INNER_PRODUCT)
+        else:
+            if dim % params["m"]:
+                raise ValueError(f"PQ sub-quantizers m={params['m']} must divide the dimension {dim}")
+            # Likewise ~39 points per PQ centroid (2 ** nbits centroids per sub-quantizer)
+            params["nbits"] = max(1, min(params["nbits"], int(math.log2(max(n // 39, 2)))))
+            index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["m"], params["nbits"],
+                                     faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+
+    index.add(embeddings)
+    configure_search(index, index_type, params)
+    return index, params
+
+
+def configure_search(index, index_type, params):
+    """Apply the search-time knobs (efSearch / nprobe) stored in the index config."""
+    if index_type == "hnsw":
+        index.hnsw.efSearch = params["efSearch"]
+    elif index_type in ("ivf", "ivfpq"):
+        index.nprobe = min(params["nprobe"], params["nlist"])
 
 
 class FAISSRetriever:
-    def __init__(self, data_path="data/coaching_millionaer_dataset.json"):
+    def __init__(self, data_path="data/coaching_millionaer_dataset.json", index_type="flat", index_params=None,
+                 rerank_skip_margin=0.15, rerank_max_chars=1000):
         """
         Multilingual FAISS retriever for the 'Coaching Millionär' dataset.
         Supports English and German queries.
+        index_type selects the FAISS structure: "flat" (exact), "hnsw", "ivf" or "ivfpq".
+        Reranking is skipped when the top dense score leads by rerank_skip_margin.
         """
         self.data_path = data_path
         self.index_path = "data/faiss_index.bin"
         self.meta_path = "data/faiss_metadata.json"
+        self.config_path = "data/faiss_index.json"
+        self.index_type = index_type
+        self.index_params = index_params or {}
 
         # ✅ multilingual model (English + German + 50+ languages)
         self.model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
+        self.query_embedder = CachedEmbedder(self.model, "sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
 
         # optional reranker for better precision
-        self.reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2", max_length=256)
+        self.adaptive_reranker = AdaptiveReranker(
+            self.reranker, skip_margin=rerank_skip_margin, max_chars=rerank_max_chars
+        )
 
         # Load existing FAISS index or build new one
-        if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
+        config = self._load_config()
+        if (
+            os.path.exists(self.index_path) and os.path.exists(self.meta_path)
+            and config.get("index_type", "flat") == index_type
+            and config.get("requested_params", {}) == self.index_params
+        ):
             self.index = faiss.read_index(self.index_path)
+            configure_search(self.index, index_type, {**INDEX_DEFAULTS[index_type], **config.get("params", {})})
             with open(self.meta_path, "r", encoding="utf-8") as f:
                 self.metadata = json.load(f)
-            print("✅ Loaded existing FAISS index.")
+            print(f"✅ Loaded existing FAISS index ({index_type}).")
         else:
             self._build_index()
 
+    def _load_config(self):
+        if os.path.exists(self.config_path):
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
     def _build_index(self):
         """Build and save FAISS index from dataset."""
         with open(self.data_path, "r", encoding="utf-8") as f:
@@ -38,34 +115,42 @@ class FAISSRetriever:
 
         texts = [item["text"] for item in dataset]
         embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        embeddings = normalize(embeddings)
+        embeddings = normalize(embeddings).astype(np.float32)
 
-        self.index = faiss.IndexFlatIP(embeddings.shape[1])
-        self.index.add(embeddings)
+        self.index, params = create_index(self.index_type, embeddings, self.index_params)
 
         self.metadata = dataset
         os.makedirs("data", exist_ok=True)
         faiss.write_index(self.index, self.index_path)
         with open(self.meta_path, "w", encoding="utf-8") as f:
             json.dump(self.metadata, f, ensure_ascii=False)
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "index_type": self.index_type,
+                "params": params,
+                "requested_params": self.index_params,
+                "dim": int(embeddings.shape[1]),
+                "count": int(embeddings.shape[0]),
+            }, f, indent=2)
 
-        print(f"✅ Built new FAISS index from {len(texts)} passages.")
+        print(f"✅ Built new FAISS index ({self.index_type}) from {len(texts)} passages.")
 
     def retrieve(self, question, top_k=10):
         """
         Retrieve relevant passages from the FAISS index.
         Automatically boosts results mentioning key entities like 'Javid Niazi-Hoffmann'.
         """
-        query_vec = self.model.encode([question], convert_to_numpy=True)
+        query_vec = self.query_embedder.encode([question], convert_to_numpy=True)
         query_vec = normalize(query_vec)
 
         scores, indices = self.index.search(query_vec, top_k)
-        results = []
+        results, raw_scores, ids = [], [], []
 
         # small keyword boost for known entities
         boost_keywords = ["Javid", "Niazi", "Hoffmann", "Coaching", "Millionär"]
         for idx, score in zip(indices[0], scores[0]):
-            if idx < len(self.metadata):
+            # ANN indexes pad with -1 when fewer than top_k neighbours are found
+            if 0 <= idx < len(self.metadata):
                 item = self.metadata[idx]
                 text = item["text"]
                 boost = any(k.lower() in text.lower() for k in boost_keywords)
@@ -75,15 +160,17 @@ class FAISSRetriever:
                     "context": text,
                     "score": final_score
                 })
+                raw_scores.append(float(score))
+                ids.append(int(idx))
 
-        # ✅ Rerank using cross-encoder for higher accuracy
+        # ✅ Rerank using cross-encoder for higher accuracy, unless the dense ranking is decisive
         if results:
-            pairs = [(question, r["context"]) for r in results]
-            rerank_scores = self.reranker.predict(pairs)
-            results = [
-                {**r, "rerank_score": float(s)}
-                for r, s in zip(results, rerank_scores)
-            ]
-            results = sorted(results, key=lambda x: x["rerank_score"], reverse=True)[:top_k]
+            results, info = self.adaptive_reranker.rerank(question, results, raw_scores, ids)
+            if info["skipped"]:
+                # Without the cross-encoder the keyword-boosted score decides the order
+                results = sorted(results, key=lambda x: x["score"], reverse=True)
+            results = results[:top_k]
+            path = "skipped" if info["skipped"] else f"{info['scored_pairs']} scored, {info['cached_pairs']} cached"
+            print(f"⏱️ Rerank: {info['rerank_ms']:.1f} ms ({path})")
 
         return results
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from retriever.bm25_index import BM25Index
+from retriever.chunking import clean_ocr
+
+
+class HybridRetriever:
+    """
+    Hybrid lexical + dense retriever for the coaching dataset.
+
+    Runs BM25 over the same passages as the dense index and the wrapped dense
+    retriever in parallel, then fuses both rankings with reciprocal-rank
+    fusion ("rrf") or a weighted sum of max-normalized scores ("weighted").
+    Fused scores are scaled to 0–1 so the usual MIN_SCORE filter still applies;
+    results keep the {"id", "context", "page", "score"} shape. `documents`
+    must be the passages of the dense index (build_index.py chunks), so both
+    rankings are joined on the passage id.
+    """
+
+    def __init__(self, dense, documents, fusion="rrf", rrf_k=60, dense_weight=0.6, candidates=20):
+        self.dense = dense
+        self.embedder = dense.embedder
+        self.documents = documents
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.dense_weight = dense_weight
+        self.candidates = candidates
+        self.bm25 = BM25Index.build(clean_ocr(d["context"]) for d in documents)
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid")
+        print(f"✅ Hybrid retriever ready ({fusion}, {len(documents)} lexical passages).")
+
+    def lexical(self, query, top_k):
+        scores = self.bm25.get_scores(query)
+        return [
+            {"id": self.documents[i].get("id"), "context": self.documents[i]["context"],
+             "page": self.documents[i].get("page"), "score": float(scores[i])}
+            for i in BM25Index.top_k(scores, top_k) if scores[i] > 0
+        ]
+
+    @staticmethod
+    def _timed(fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, (time.perf_counter() - start) * 1000
+
+    def fuse(self, dense, lexical, top_k):
+        fused = {}
+        rankings = [("dense", dense, self.dense_weight), ("bm25", lexical, 1 - self.dense_weight)]
+        for name, ranking, weight in rankings:
+            top = max((r["score"] for r in ranking), default=0.0) or 1.0
+            for rank, r in enumerate(ranking):
+                # Indexes built before passages had ids are joined on their text
+                key = r.get("id") or (r.get("page"), r["context"])
+                entry = fused.setdefault(key, {"id": r.get("id"), "context": r["context"], "page": r.get("page"), "score": 0.0})
+                entry[f"{name}_score"] = r["score"]
+                if self.fusion == "weighted":
+                    entry["score"] += weight * r["score"] / top
+                else:
+                    entry["score"] += 1.0 / (self.rrf_k + rank + 1)
+
+        results = sorted(fused.values(), key=lambda x: x["score"], reverse=True)[:top_k]
+        if self.fusion != "weighted":
+            # Best possible RRF score is first place in every ranking
+            best = len(rankings) / (self.rrf_k + 1)
+            for r in results:
+                r["score"] /= best
+        return results
+
+    def retrieve_with_timings(self, query, top_k=10):
+        """Return (results, per-stage latency in milliseconds)."""
+        start = time.perf_counter()
+        dense_future = self.executor.submit(self._timed, self.dense.retrieve, query, self.candidates)
+        lexical_future = self.executor.submit(self._timed, self.lexical, query, self.candidates)
+        dense, dense_ms = dense_future.result()
+        lexical, lexical_ms = lexical_future.result()
+
+        fuse_start = time.perf_counter()
+        results = self.fuse(dense, lexical, top_k)
+        end = time.perf_counter()
+        return results, {
+            "dense_ms": dense_ms,
+            "bm25_ms": lexical_ms,
+            "fusion_ms": (end - fuse_start) * 1000,
+            "total_ms": (end - start) * 1000,
+        }
+
+    def retrieve(self, query, top_k=10):
+        results, timings = self.retrieve_with_timings(query, top_k)
+        print("⏱️ Hybrid retrieval: " + ", ".join(f"{k}={v:.1f}" for k, v in timings.items()))
+        return results
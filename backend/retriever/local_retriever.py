@@ -0,0 +1,135 @@
+import json
+import os
+import time
+import numpy as np
+
+
+class LocalRetriever:
+    """
+    In-process vector retriever for the 'Coaching Millionär' dataset.
+    Loads a precomputed, memory-mapped embedding matrix and answers top-k
+    with a single NumPy dot product. Drop-in replacement for the Pinecone
+    retriever: results use the same {"id", "context", "page", "score"} shape.
+    """
+
+    def __init__(self, embedder, index_dir="data/local_index"):
+        self.embedder = embedder
+        self.index_dir = index_dir
+        self.embeddings_path = os.path.join(index_dir, "embeddings.npy")
+        self.meta_path = os.path.join(index_dir, "metadata.json")
+
+        if not (os.path.exists(self.embeddings_path) and os.path.exists(self.meta_path)):
+            raise FileNotFoundError(
+                f"Local index not found in '{index_dir}'. "
+                "Build it with: python build_index.py --target local"
+            )
+
+        # Memory-mapped so every worker shares the same page cache
+        self.embeddings = np.load(self.embeddings_path, mmap_mode="r")
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+
+        if len(self.metadata) != self.embeddings.shape[0]:
+            raise ValueError("Local index metadata does not match the embedding matrix.")
+        print(f"✅ Loaded local index with {len(self.metadata)} passages.")
+
+    def search(self, query_vec, top_k=10):
+        """Return (indices, scores) of the top_k rows for a normalized query vector."""
+        scores = self.embeddings @ np.asarray(query_vec, dtype=np.float32)
+        top_k = min(top_k, scores.shape[0])
+        if top_k <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def retrieve(self, query, top_k=10):
+        query_vec = np.asarray(self.embedder.encode(query), dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) or 1.0)
+        indices, scores = self.search(query_vec, top_k)
+        results = []
+        for idx, score in zip(indices, scores):
+            meta = self.metadata[idx]
+            results.append({
+                "id": meta.get("id"),
+                "context": meta.get("context", ""),
+                "page": meta.get("page"),
+                "score": float(score)
+            })
+        return results
+
+
+def load_documents(data_path):
+    """Load dataset entries as [{"page", "context"}], skipping items without text."""
+    with open(data_path, "r", encoding="utf-8") as f:
+        docs = json.load(f)
+
+    documents = []
+    for i, doc in enumerate(docs):
+        # Handle multiple possible content keys safely
+        content = (
+            doc.get("content")
+            or doc.get("text")
+            or doc.get("context")
+            or doc.get("paragraph")
+        )
+        if not content:
+            print(f"⚠️ Skipping item {i} (no text field found)")
+            continue
+        documents.append({"id": str(i), "page": doc.get("page"), "context": content})
+    return documents
+
+
+def benchmark(retriever, questions, top_k=10, repeats=20):
+    """Time `retriever.retrieve` and return mean/p95 latency in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        for q in questions:
+            start = time.perf_counter()
+            retriever.retrieve(q, top_k=top_k)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "queries": len(timings),
+        "mean_ms": sum(timings) / len(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+# Example usage:
+#   python build_index.py --target local          (build / update the index)
+#   python -m retriever.local_retriever --bench
+if __name__ == "__main__":
+    import argparse
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Benchmark the local vector index.")
+    parser.add_argument("--bench", action="store_true", help="Benchmark local vs. Pinecone retrieval")
+    parser.add_argument("--index-dir", default="data/local_index")
+    parser.add_argument("--model", default="./model")
+    args = parser.parse_args()
+
+    model = SentenceTransformer(args.model)
+
+    if args.bench:
+        questions = [
+            "Wer ist Javid Niazi-Hoffmann?",
+            "Wie gewinne ich Traumkunden?",
+            "How do I scale my coaching business?",
+        ]
+        local = LocalRetriever(model, args.index_dir)
+        print("Local:", benchmark(local, questions))
+
+        api_key = os.getenv("PINECONE_API_KEY")
+        if api_key:
+            from pinecone import Pinecone
+            index = Pinecone(api_key=api_key).Index(os.getenv("PINECONE_INDEX_NAME", "ebook"))
+
+            class _Pinecone:
+                def retrieve(self, query, top_k=10):
+                    emb = model.encode(query).tolist()
+                    return index.query(vector=emb, top_k=top_k, include_metadata=True)
+
+            print("Pinecone:", benchmark(_Pinecone(), questions, repeats=3))
+        else:
+            print("⚠️ PINECONE_API_KEY not set, skipping Pinecone benchmark.")
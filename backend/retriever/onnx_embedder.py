@@ -0,0 +1,182 @@
+"""
+ONNX Runtime inference backend for the bundled MiniLM sentence embedder.
+
+Exports ./model (BertModel + mean pooling from 1_Pooling + L2 normalize) to a
+single ONNX graph, applies dynamic int8 quantization and serves it through
+ONNX Runtime on CPU with the same encode() contract as SentenceTransformer.
+
+Usage:
+    python -m retriever.onnx_embedder --export --check --bench
+"""
+import json
+import os
+import time
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+
+MODEL_DIR = "./model"
+ONNX_DIR = "./model/onnx"
+FP32_NAME = "model.onnx"
+INT8_NAME = "model.int8.onnx"
+
+
+def export(model_dir=MODEL_DIR, out_dir=ONNX_DIR, quantize=True):
+    """Export the transformer with pooling + normalization, optionally int8-quantized."""
+    import torch
+    from transformers import AutoModel
+
+    with open(os.path.join(model_dir, "1_Pooling", "config.json"), "r", encoding="utf-8") as f:
+        pooling = json.load(f)
+    if not pooling.get("pooling_mode_mean_tokens"):
+        raise ValueError("Only mean pooling is supported by the ONNX export.")
+
+    class PooledEncoder(torch.nn.Module):
+        def __init__(self, bert):
+            super().__init__()
+            self.bert = bert
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            hidden = self.bert(input_ids=input_ids, attention_mask=attention_mask,
+                               token_type_ids=token_type_ids).last_hidden_state
+            mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            return torch.nn.functional.normalize(pooled, p=2, dim=1)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = PooledEncoder(AutoModel.from_pretrained(model_dir)).eval()
+    sample = tokenizer(["Wer ist Javid Niazi-Hoffmann?"], return_tensors="pt")
+
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, FP32_NAME)
+    dynamic = {0: "batch", 1: "sequence"}
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["sentence_embedding"],
+            dynamic_axes={
+                "input_ids": dynamic,
+                "attention_mask": dynamic,
+                "token_type_ids": dynamic,
+                "sentence_embedding": {0: "batch"},
+            },
+            opset_version=14,
+        )
+    print(f"✅ Exported ONNX model to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(out_dir, INT8_NAME)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized int8 model written to {int8_path}")
+
+
+class OnnxEmbedder:
+    """Drop-in replacement for SentenceTransformer.encode backed by ONNX Runtime."""
+
+    def __init__(self, model_dir=MODEL_DIR, onnx_path=None, threads=None):
+        onnx_path = onnx_path or os.path.join(ONNX_DIR, INT8_NAME)
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at '{onnx_path}'. Export it with: python -m retriever.onnx_embedder --export"
+            )
+
+        with open(os.path.join(model_dir, "sentence_bert_config.json"), "r", encoding="utf-8") as f:
+            self.max_seq_length = json.load(f).get("max_seq_length", 256)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        print(f"✅ ONNX embedder loaded from {onnx_path}")
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        # The exported graph always L2-normalizes, so normalize_embeddings is a no-op
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        # Sorting by length keeps padding per batch small
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            features = self.tokenizer(
+                [texts[i] for i in idx], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np",
+            )
+            feed = {k: v.astype(np.int64) for k, v in features.items() if k in self.input_names}
+            vectors = self.session.run(None, feed)[0]
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[idx] = vectors
+
+        if out is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return out[0] if single else out
+
+
+def parity_check(reference, candidate, sentences, threshold=0.99):
+    """Cosine similarity between two embedders' outputs; fails below threshold."""
+    a = np.asarray(reference.encode(sentences, normalize_embeddings=True))
+    b = np.asarray(candidate.encode(sentences, normalize_embeddings=True))
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    result = {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean()),
+              "passed": bool(cosines.min() >= threshold)}
+    print(f"{'✅' if result['passed'] else '❌'} Parity: min cosine {result['min_cosine']:.4f}, "
+          f"mean {result['mean_cosine']:.4f} (threshold {threshold})")
+    return result
+
+
+def throughput(embedder, sentences, batch_size=32, single=False):
+    """Sentences per second, either batched or one encode() call per sentence."""
+    embedder.encode(sentences[:4])  # warmup
+    start = time.perf_counter()
+    if single:
+        for s in sentences:
+            embedder.encode(s)
+    else:
+        embedder.encode(sentences, batch_size=batch_size)
+    return len(sentences) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export, verify and benchmark the ONNX embedder.")
+    parser.add_argument("--export", action="store_true")
+    parser.add_argument("--no-quantize", action="store_true", help="Export fp32 only")
+    parser.add_argument("--check", action="store_true", help="Parity check against PyTorch (cosine >= 0.99)")
+    parser.add_argument("--bench", action="store_true", help="Encode throughput, PyTorch vs ONNX")
+    parser.add_argument("--onnx-path", help="ONNX file to load (default: int8 model)")
+    parser.add_argument("--data", default="data/coaching_millionaer_dataset.json")
+    args = parser.parse_args()
+
+    if args.export:
+        export(quantize=not args.no_quantize)
+
+    if args.check or args.bench:
+        from sentence_transformers import SentenceTransformer
+        from retriever.local_retriever import load_documents
+
+        passages = [d["context"] for d in load_documents(args.data)]
+        questions = ["Wer ist Javid Niazi-Hoffmann?", "Wie gewinne ich Traumkunden?",
+                     "How do I scale my coaching business?"] * 20
+
+        torch_model = SentenceTransformer(MODEL_DIR)
+        onnx_model = OnnxEmbedder(onnx_path=args.onnx_path)
+
+        if args.check:
+            result = parity_check(torch_model, onnx_model, passages + questions[:3])
+            if not result["passed"]:
+                raise SystemExit(1)
+
+        if args.bench:
+            for name, model in [("pytorch", torch_model), ("onnx", onnx_model)]:
+                print(f"{name:<8} batched: {throughput(model, passages):8.1f} sent/s   "
+                      f"single query: {throughput(model, questions, single=True):8.1f} sent/s")
@@ -1,9 +1,13 @@
 from pinecone import Pinecone
 from sentence_transformers import SentenceTransformer
+from cache.embedding_cache import CachedEmbedder
 
 class PineconeRetriever:
     def __init__(self, api_key: str, index_name: str):
-        self.model = SentenceTransformer("sentence-transformers/paraphrase-MiniLM-L3-v2")
+        self.model = CachedEmbedder(
+            SentenceTransformer("sentence-transformers/paraphrase-MiniLM-L3-v2"),
+            "sentence-transformers/paraphrase-MiniLM-L3-v2"
+        )
         self.pinecone = Pinecone(api_key=api_key)
         self.index = self.pinecone.Index(index_name)
 
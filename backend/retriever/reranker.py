@@ -0,0 +1,144 @@
+import hashlib
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+
+class AdaptiveReranker:
+    """
+    Cross-encoder reranking that only pays for what it needs.
+
+    - Skips the cross-encoder when the first-stage top score already leads the
+      runner-up by at least `skip_margin`.
+    - Caps each passage at `max_chars` before scoring.
+    - Caches pair scores keyed by (query hash, passage id).
+    - Coalesces pairs from concurrent requests into one `predict` call per
+      `window_ms` / `max_batch` pairs.
+    Per-request timings and skip/cache rates are available from stats().
+    """
+
+    def __init__(self, cross_encoder, skip_margin=0.15, max_chars=1000, cache_size=4096,
+                 window_ms=5.0, max_batch=64):
+        self.cross_encoder = cross_encoder
+        self.skip_margin = skip_margin
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+        # Metrics
+        self.requests = 0
+        self.skipped = 0
+        self.pairs_cached = 0
+        self.pairs_scored = 0
+        self.batches = 0
+        self.timings_ms = deque(maxlen=1000)
+
+        threading.Thread(target=self._run, name="rerank-batcher", daemon=True).start()
+
+    @staticmethod
+    def _query_hash(question: str) -> str:
+        return hashlib.sha1(" ".join(question.split()).lower().encode("utf-8")).hexdigest()
+
+    def _predict(self, pairs):
+        """Queue pairs for the batch worker and wait for their scores."""
+        future = Future()
+        self._queue.put((pairs, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0][0])
+            deadline = time.perf_counter() + self.window
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job[0])
+
+            try:
+                scores = self.cross_encoder.predict([pair for pairs, _ in jobs for pair in pairs])
+            except Exception as e:
+                for _, future in jobs:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches += 1
+            offset = 0
+            for pairs, future in jobs:
+                future.set_result([float(s) for s in scores[offset:offset + len(pairs)]])
+                offset += len(pairs)
+
+    def rerank(self, question, results, first_stage_scores, ids):
+        """
+        Rerank `results` (sorted by first-stage score) for `question`.
+        Returns (results, info) where info holds this request's timing and path.
+        """
+        start = time.perf_counter()
+        info = {"skipped": False, "cached_pairs": 0, "scored_pairs": 0}
+
+        if len(results) > 1 and first_stage_scores[0] - first_stage_scores[1] >= self.skip_margin:
+            info["skipped"] = True
+        elif results:
+            qhash = self._query_hash(question)
+            keys = [(qhash, pid) for pid in ids]
+            scores = [None] * len(results)
+            with self._lock:
+                for i, key in enumerate(keys):
+                    if key in self._cache:
+                        self._cache.move_to_end(key)
+                        scores[i] = self._cache[key]
+
+            missing = [i for i, s in enumerate(scores) if s is None]
+            if missing:
+                pairs = [(question, results[i]["context"][:self.max_chars]) for i in missing]
+                for i, s in zip(missing, self._predict(pairs)):
+                    scores[i] = s
+                with self._lock:
+                    for i in missing:
+                        self._cache[keys[i]] = scores[i]
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+            info["cached_pairs"] = len(results) - len(missing)
+            info["scored_pairs"] = len(missing)
+            results = sorted(
+                ({**r, "rerank_score": s} for r, s in zip(results, scores)),
+                key=lambda x: x["rerank_score"], reverse=True
+            )
+
+        info["rerank_ms"] = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.requests += 1
+            self.skipped += info["skipped"]
+            self.pairs_cached += info["cached_pairs"]
+            self.pairs_scored += info["scored_pairs"]
+            self.timings_ms.append(info["rerank_ms"])
+        return results, info
+
+    def stats(self):
+        with self._lock:
+            timings = sorted(self.timings_ms)
+            pairs = self.pairs_cached + self.pairs_scored
+            return {
+                "requests": self.requests,
+                "skip_rate": self.skipped / self.requests if self.requests else 0.0,
+                "pair_cache_hit_rate": self.pairs_cached / pairs if pairs else 0.0,
+                "pairs_scored": self.pairs_scored,
+                "batches": self.batches,
+                "mean_ms": sum(timings) / len(timings) if timings else 0.0,
+                "p95_ms": timings[int(len(timings) * 0.95) - 1] if timings else 0.0,
+            }
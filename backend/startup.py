@@ -0,0 +1,71 @@
+import threading
+import time
+import traceback
+
+
+class Startup:
+    """
+    Background initialization of heavy components with readiness tracking.
+
+    Components are registered as (name, loader) pairs and loaded in order on a
+    daemon thread, so the server can bind its port immediately. Each component
+    reports its state ("pending", "loading", "ready", "failed"), load time and
+    error. The service is ready once every required component is ready.
+    """
+
+    def __init__(self, retry_after=5):
+        self.retry_after = retry_after
+        self._components = []
+        self._status = {}
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._started_at = None
+
+    def register(self, name, loader, required=True):
+        self._components.append((name, loader, required))
+        self._status[name] = {"state": "pending", "required": required}
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        threading.Thread(target=self._run, name="startup", daemon=True).start()
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def _run(self):
+        for name, loader, required in self._components:
+            self._set(name, state="loading")
+            start = time.perf_counter()
+            try:
+                loader()
+                self._set(name, state="ready", seconds=round(time.perf_counter() - start, 3))
+                print(f"✅ {name} ready in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                self._set(name, state="failed", seconds=round(time.perf_counter() - start, 3), error=str(e))
+                print(f"❌ {name} failed to load:", e)
+                traceback.print_exc()
+        self._done.set()
+        print(f"🚀 Startup finished in {time.perf_counter() - self._started_at:.2f}s (ready: {self.ready})")
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return all(s["state"] == "ready" for s in self._status.values() if s["required"])
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        """Block until startup finished; returns readiness."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self):
+        with self._lock:
+            return {
+                "ready": all(s["state"] == "ready" for s in self._status.values() if s["required"]),
+                "finished": self._done.is_set(),
+                "components": {name: dict(s) for name, s in self._status.items()},
+            }
@@ -0,0 +1,65 @@
+"""
+Sentence-level helpers for the pipelined voice endpoint.
+
+The answer streams in as completion deltas; SentenceBuffer releases complete
+sentences as soon as they end so text-to-speech can start on the first one
+while the rest of the answer is still being generated.
+"""
+import base64
+import re
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])[\"”)]*\s+|\n+")
+MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+MARKDOWN_MARKUP = re.compile(r"(^|\s)#{1,6}\s+|[*_`>|]+|^\s*[-•]\s+|^\s*\d+\.\s+", re.MULTILINE)
+
+
+def speakable(text: str) -> str:
+    """Strip markdown so TTS does not read out asterisks, hashes or link targets."""
+    text = MARKDOWN_LINK.sub(r"\1", text)
+    text = MARKDOWN_MARKUP.sub(" ", text)
+    return " ".join(text.split())
+
+
+class SentenceBuffer:
+    """
+    Accumulates streamed text and returns complete sentences.
+    Sentences shorter than `min_chars` are merged with the next one, so very
+    short fragments ("Ja.") do not each cost a TTS round trip; text longer than
+    `max_chars` without a boundary is cut at the last space.
+    """
+
+    def __init__(self, min_chars=40, max_chars=400):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._text = ""
+
+    def feed(self, delta: str):
+        self._text += delta
+        sentences = []
+        while True:
+            cut = None
+            for match in SENTENCE_END.finditer(self._text):
+                if len(self._text[:match.start()].strip()) >= self.min_chars:
+                    cut = match
+                    break
+            if cut is not None:
+                sentences.append(self._text[:cut.start()].strip())
+                self._text = self._text[cut.end():]
+            elif len(self._text) > self.max_chars:
+                split = self._text.rfind(" ", 0, self.max_chars)
+                split = split if split > 0 else self.max_chars
+                sentences.append(self._text[:split].strip())
+                self._text = self._text[split:]
+            else:
+                break
+        return [s for s in sentences if speakable(s)]
+
+    def flush(self):
+        rest, self._text = self._text.strip(), ""
+        return [rest] if speakable(rest) else []
+
+
+def audio_event(index: int, sentence: str, audio: bytes, url=None, mimetype="audio/mpeg"):
+    """Payload of one `audio` SSE event: a self-contained mp3 for one sentence (also served at `url`)."""
+    return {"index": index, "text": sentence, "mimetype": mimetype, "url": url,
+            "audio": base64.b64encode(audio).decode("ascii")}
@@ -32,6 +32,8 @@ const CoachingChatbot = () => {
   const [voiceLanguage, setVoiceLanguage] = useState<'en-US' | 'de-DE'>('de-DE'); // Default to Deutsch
   const [showVoiceChat, setShowVoiceChat] = useState(false);
   const scrollAreaRef = useRef<HTMLDivElement>(null);
+  // Issued by the backend on the first answer; sent back so follow-ups keep the conversation context
+  const sessionIdRef = useRef<string | undefined>(undefined);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
 
   const scrollToBottom = () => {
@@ -76,13 +78,17 @@ const CoachingChatbot = () => {
     try {
       const response = await axios.post<ApiResponse>(
         "https://mahmous-chatbot3.hf.space/ask",
-        { question: fullMessage },
+        { question: fullMessage, session_id: sessionIdRef.current },
         {
           headers: { "Content-Type": "application/json" },
           timeout: 30000,
         }
       );
 
+      if (response.data?.session_id) {
+        sessionIdRef.current = response.data.session_id;
+      }
+
       if (response.data?.answers && Array.isArray(response.data.answers)) {
         const botMessages: ChatMessage[] = response.data.answers.map((answer: CoachingAnswer, index: number) => ({
           id: `${Date.now()}-${index}`,
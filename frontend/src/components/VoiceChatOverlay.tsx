@@ -9,6 +9,16 @@ interface VoiceChatOverlayProps {
   onClose: () => void;
 }
 
+// Payload of one /voice/stream event (fields depend on the event type)
+interface VoiceEventData {
+  text?: string;
+  audio?: string;
+  mimetype?: string;
+  answer?: string;
+  error?: string;
+  session_id?: string;
+}
+
 const VoiceChatOverlay = ({ onClose }: VoiceChatOverlayProps) => {
   const [isRecording, setIsRecording] = useState(false);
   const [isSpeaking, setIsSpeaking] = useState(false);
@@ -22,6 +32,11 @@ const VoiceChatOverlay = ({ onClose }: VoiceChatOverlayProps) => {
   const streamRef = useRef<MediaStream | null>(null);
   const timerRef = useRef<number | null>(null);
   const currentAudioRef = useRef<HTMLAudioElement | null>(null);
+  const audioQueueRef = useRef<string[]>([]);
+  const answerRef = useRef('');
+  const streamDoneRef = useRef(true);
+  const streamAbortRef = useRef<AbortController | null>(null);
+  const sessionIdRef = useRef<string | undefined>(undefined); // keeps follow-up questions in one conversation
 
   useEffect(() => {
     startTimer();
@@ -85,70 +100,126 @@ const VoiceChatOverlay = ({ onClose }: VoiceChatOverlayProps) => {
     }
   };
 
+  const base64ToObjectUrl = (base64: string, mimetype: string) => {
+    const bytes = Uint8Array.from(atob(base64), (c) => c.charCodeAt(0));
+    return URL.createObjectURL(new Blob([bytes], { type: mimetype }));
+  };
+
+  // Sentence audio arrives in order while the answer streams; play it back to back
+  const playNextInQueue = () => {
+    if (currentAudioRef.current) return;
+
+    const next = audioQueueRef.current.shift();
+    if (!next) {
+      if (streamDoneRef.current) setIsSpeaking(false);
+      return;
+    }
+
+    setIsSpeaking(true);
+    const audio = new Audio(next);
+    currentAudioRef.current = audio;
+
+    const advance = () => {
+      URL.revokeObjectURL(next);
+      currentAudioRef.current = null;
+      playNextInQueue();
+    };
+    audio.onended = advance;
+    audio.onerror = advance;
+
+    const playPromise = audio.play();
+    if (playPromise !== undefined) {
+      playPromise.catch(error => {
+        console.error('Error playing audio:', error);
+        advance();
+      });
+    }
+  };
+
+  const handleVoiceEvent = (event: string, data: VoiceEventData) => {
+    switch (event) {
+      case 'transcript':
+        setTranscript(data.text ?? '');
+        break;
+      case 'token':
+        answerRef.current += data.text ?? '';
+        setAiResponse(answerRef.current);
+        break;
+      case 'audio':
+        if (!data.audio) break;
+        setIsProcessing(false);
+        audioQueueRef.current.push(base64ToObjectUrl(data.audio, data.mimetype ?? 'audio/mpeg'));
+        playNextInQueue();
+        break;
+      case 'done':
+        if (data.answer) setAiResponse(data.answer);
+        if (data.session_id) sessionIdRef.current = data.session_id;
+        if (data.error) console.error('Voice pipeline error:', data.error);
+        streamDoneRef.current = true;
+        if (!currentAudioRef.current && audioQueueRef.current.length === 0) setIsSpeaking(false);
+        break;
+    }
+  };
+
   const sendAudioToBackend = async () => {
     setIsProcessing(true);
+    answerRef.current = '';
+    streamDoneRef.current = false;
+    setAiResponse('');
+
+    const controller = new AbortController();
+    streamAbortRef.current = controller;
 
     try {
       const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' });
       const formData = new FormData();
-      formData.append('audio', audioBlob, 'voice.wav');
+      formData.append('audio', audioBlob, 'voice.webm');
+      if (sessionIdRef.current) formData.append('session_id', sessionIdRef.current);
 
-      const response = await fetch('https://mahmous-chatbot3.hf.space/voice', {
+      const response = await fetch('https://mahmous-chatbot3.hf.space/voice/stream', {
         method: 'POST',
         body: formData,
+        signal: controller.signal,
       });
-
-      const data = await response.json();
-
-      if (data.transcript) setTranscript(data.transcript);
-      if (data.answer) setAiResponse(data.answer);
-      if (data.audio_url) await playAudioResponse(data.audio_url);
+      if (!response.ok || !response.body) throw new Error(`Voice request failed (${response.status})`);
+
+      // Server-Sent Events over the fetch body: "event: x\ndata: {...}\n\n"
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary: number;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const raw = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = raw.match(/^data: (.*)$/m)?.[1];
+          if (event && data) handleVoiceEvent(event, JSON.parse(data));
+        }
+      }
     } catch (error) {
-      console.error('Error sending audio to backend:', error);
+      if ((error as Error).name !== 'AbortError') {
+        console.error('Error sending audio to backend:', error);
+      }
     } finally {
+      streamDoneRef.current = true;
+      streamAbortRef.current = null;
       setIsProcessing(false);
     }
   };
 
-  const playAudioResponse = async (audioUrl: string) => {
-    setIsSpeaking(true);
-
-    try {
-      if (currentAudioRef.current) {
-        currentAudioRef.current.pause();
-        currentAudioRef.current = null;
-      }
-
-      const audio = new Audio(audioUrl);
-      currentAudioRef.current = audio;
-
-      audio.onended = () => {
-        setIsSpeaking(false);
-        currentAudioRef.current = null;
-      };
-
-      audio.onerror = () => {
-        setIsSpeaking(false);
-        currentAudioRef.current = null;
-      };
-
-      // Mobile-friendly audio playback
-      audio.load();
-      const playPromise = audio.play();
-      
-      if (playPromise !== undefined) {
-        playPromise.catch(error => {
-          console.error('Error playing audio:', error);
-          setIsSpeaking(false);
-        });
-      }
-    } catch (error) {
-      console.error('Error playing audio:', error);
-      setIsSpeaking(false);
-    }
+  const clearAudioQueue = () => {
+    streamAbortRef.current?.abort();
+    audioQueueRef.current.forEach(url => URL.revokeObjectURL(url));
+    audioQueueRef.current = [];
   };
 
   const stopSpeaking = () => {
+    clearAudioQueue();
     if (currentAudioRef.current) {
       currentAudioRef.current.pause();
       currentAudioRef.current.currentTime = 0;
@@ -173,6 +244,7 @@ const VoiceChatOverlay = ({ onClose }: VoiceChatOverlayProps) => {
       streamRef.current = null;
     }
 
+    clearAudioQueue();
     if (currentAudioRef.current) {
       currentAudioRef.current.pause();
       currentAudioRef.current.currentTime = 0;
@@ -16,8 +16,10 @@ export interface CoachingAnswer {
 
 export interface ApiResponse {
   answers: CoachingAnswer[];
+  session_id?: string;
 }
 
 export interface ApiRequest {
   question: string;
+  session_id?: string;
 }
\ No newline at end of file